@@ -1,20 +1,28 @@
 from __future__ import annotations
 import os
 from flask import Flask, redirect, url_for, session
-from flask_session import Session
 from config import Config
-from db import db
+from db import db, init_engine
 
 def create_app() -> Flask:
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    os.makedirs(app.config["SESSION_FILE_DIR"], exist_ok=True)
     os.makedirs(app.config.get("UPLOAD_FOLDER", "uploads"), exist_ok=True)
     os.makedirs("data", exist_ok=True)
 
-    Session(app)
     db.init_app(app)
+    init_engine(app)
+
+    from services import ollama_service, cache_service, job_service, auth_service, session_service, schema_service, ingest_service, sheet_pdf_service
+    schema_service.init_app(app)
+    session_service.init_app(app)
+    auth_service.init_app(app)
+    ollama_service.init_app(app)
+    cache_service.init_app(app)
+    job_service.init_app(app)
+    ingest_service.init_app(app)
+    sheet_pdf_service.init_app(app)
 
     from routes.auth import auth_bp
     from routes.admin import admin_bp
@@ -23,6 +31,7 @@ def create_app() -> Flask:
     from routes.campaigns import campaigns_bp
     from routes.characters import characters_bp
     from routes.templates import templates_bp
+    from routes.builder import builder_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
@@ -31,6 +40,7 @@ def create_app() -> Flask:
     app.register_blueprint(campaigns_bp)
     app.register_blueprint(characters_bp)
     app.register_blueprint(templates_bp)
+    app.register_blueprint(builder_bp)
 
     @app.get("/")
     def home():
@@ -50,4 +60,8 @@ if __name__ == "__main__":
     port = int(os.getenv("FLASK_PORT", "5050"))
     with app.app_context():
         db.create_all()
+        from services.schema_service import migrate
+        from services.auth_service import ensure_seeded
+        migrate()
+        ensure_seeded()
     app.run(host="127.0.0.1", port=port, debug=True)
@@ -6,13 +6,54 @@ from dotenv import load_dotenv
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
 
+# Shipped fallback and the placeholders from the setup guide/script: public, so the
+# signed-cookie session backend refuses to start with any of them
+DEV_SECRET_KEY = "dev-secret-change-me-in-production"
+PLACEHOLDER_SECRET_KEYS = frozenset({DEV_SECRET_KEY, "dev-secret-change-me", "change-this-to-a-long-random-string"})
+
 class Config:
-    SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me-in-production")
+    SECRET_KEY = os.getenv("SECRET_KEY", DEV_SECRET_KEY)
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL",
         f"sqlite:///{BASE_DIR / 'data' / 'characterforge.sqlite3'}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite tuning applied to every new connection (see db.init_engine): production | development | legacy
+    DB_PROFILE = os.getenv("DB_PROFILE", "production")
+    SQLITE_PROFILES = {
+        "production": {
+            "journal_mode": "WAL",          # readers no longer block behind the writer
+            "synchronous": "NORMAL",        # durable at checkpoints; safe with WAL
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+            "cache_size": -1024 * int(os.getenv("SQLITE_CACHE_MB", "64")),
+            "mmap_size": 1024 * 1024 * int(os.getenv("SQLITE_MMAP_MB", "256")),
+            "temp_store": "MEMORY",
+        },
+        "development": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+        },
+        "legacy": {},
+    }
+    SQLITE_PRAGMAS = SQLITE_PROFILES.get(DB_PROFILE, SQLITE_PROFILES["production"])
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": 3600,
+        # pysqlite's own lock wait, in seconds, before "database is locked"
+        "connect_args": {"timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")) / 1000},
+    } if (SQLALCHEMY_DATABASE_URI.startswith("sqlite:///") and DB_PROFILE != "legacy"
+          # In-memory databases get SingletonThreadPool/StaticPool, which take none of these options
+          and ":memory:" not in SQLALCHEMY_DATABASE_URI and "mode=memory" not in SQLALCHEMY_DATABASE_URI) else {}
+    # sqlite | filesystem | cookie (signed, stateless: needs a real SECRET_KEY)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+    SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", str(BASE_DIR / "data" / "sessions.sqlite3"))
+    SESSION_SQLITE_TTL = float(os.getenv("SESSION_SQLITE_TTL", str(7 * 24 * 3600)))
+    SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "600"))
+    SESSION_COOKIE_HTTPONLY = True
+    SESSION_COOKIE_SAMESITE = "Lax"
     SESSION_TYPE = "filesystem"
     SESSION_FILE_DIR = str(BASE_DIR / "data" / "sessions")
     SESSION_PERMANENT = False
@@ -20,3 +61,35 @@ class Config:
     MAX_CONTENT_LENGTH = 20 * 1024 * 1024
     OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:4242")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+    OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "2"))
+    # Default wait for Ollama to send data: the whole reply for plain calls, each chunk for streamed ones
+    OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "90"))
+    OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "2"))
+    OLLAMA_BACKOFF = float(os.getenv("OLLAMA_BACKOFF", "0.3"))
+    OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+    OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", "45"))
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_SESSION_TTL = float(os.getenv("OLLAMA_SESSION_TTL", "3600"))
+    OLLAMA_SESSION_TURNS = int(os.getenv("OLLAMA_SESSION_TURNS", "6"))
+    AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "512"))
+    AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+    AI_CACHE_DB = os.getenv("AI_CACHE_DB", str(BASE_DIR / "data" / "ai_cache.sqlite3"))
+    AI_CACHE_DISK_MAX = int(os.getenv("AI_CACHE_DISK_MAX", "5000"))
+    NPC_JOB_WORKERS = int(os.getenv("NPC_JOB_WORKERS", "2"))
+    NPC_JOBS_PER_USER = int(os.getenv("NPC_JOBS_PER_USER", "2"))
+    # A job still "running" after this many seconds is treated as orphaned and requeued on startup
+    NPC_JOB_TIMEOUT = float(os.getenv("NPC_JOB_TIMEOUT", "900"))
+    NPC_BATCH_MAX = int(os.getenv("NPC_BATCH_MAX", "20"))
+    NPC_BATCH_CHUNK = int(os.getenv("NPC_BATCH_CHUNK", "6"))
+    NPC_BATCH_PARALLEL = int(os.getenv("NPC_BATCH_PARALLEL", "3"))
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    AUTH_VERIFY_WORKERS = int(os.getenv("AUTH_VERIFY_WORKERS", str(min(4, os.cpu_count() or 1))))
+    AUTH_VERIFY_QUEUE = int(os.getenv("AUTH_VERIFY_QUEUE", "32"))
+    AUTH_VERIFY_TIMEOUT = float(os.getenv("AUTH_VERIFY_TIMEOUT", "10"))
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "20"))
+    PDF_UPLOAD_CHUNK = int(os.getenv("PDF_UPLOAD_CHUNK", str(1024 * 1024)))
+    PDF_INGESTS_PER_USER = int(os.getenv("PDF_INGESTS_PER_USER", "3"))
+    SHEET_PDF_CACHE_DIR = os.getenv("SHEET_PDF_CACHE_DIR", str(BASE_DIR / "data" / "sheet_pdfs"))
+    SHEET_PDF_WORKERS = int(os.getenv("SHEET_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
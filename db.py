@@ -1,2 +1,58 @@
+from __future__ import annotations
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 db = SQLAlchemy()
+
+def init_engine(app) -> None:
+    """Apply SQLITE_PRAGMAS to every new SQLite connection. Call right after db.init_app(app)."""
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def count_queries(budget: int | None = None):
+    """
+    Count SQL statements issued inside the block (on any engine). With a budget, raise
+    QueryBudgetExceeded on exit if it was exceeded, listing the statements:
+
+        with count_queries(budget=6) as q:
+            client.get("/campaigns/1")
+        print(q.count)
+    """
+    counter = _QueryCounter()
+    event.listen(Engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter)
+    if budget is not None and counter.count > budget:
+        listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(counter.statements))
+        raise QueryBudgetExceeded(f"{counter.count} queries, budget {budget}:\n{listing}")
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split())[:200])
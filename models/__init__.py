@@ -1,5 +1,7 @@
 from __future__ import annotations
 from datetime import datetime
+from typing import NamedTuple
+from sqlalchemy import event
 from db import db
 
 
@@ -16,10 +18,21 @@ class User(db.Model):
     memberships = db.relationship("CampaignMembership", backref="user", lazy=True)
     templates = db.relationship("CharacterTemplate", backref="creator", lazy=True, cascade="all, delete-orphan")
 
+    # Admin role filter/ordering and the "last admin" count
+    __table_args__ = (db.Index("ix_users_role_username", "role", "username"),)
+
     def to_dict(self):
         return {"id": self.id, "username": self.username, "role": self.role, "display_name": self.display_name or self.username}
 
 
+class AppMeta(db.Model):
+    """Small key/value store for one-time startup steps (e.g. default account seeding)."""
+    __tablename__ = "app_meta"
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255), nullable=False, default="")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class Campaign(db.Model):
     __tablename__ = "campaigns"
     id = db.Column(db.Integer, primary_key=True)
@@ -33,17 +46,70 @@ class Campaign(db.Model):
     memberships = db.relationship("CampaignMembership", backref="campaign", lazy=True, cascade="all, delete-orphan")
     characters = db.relationship("Character", backref="campaign", lazy=True, cascade="all, delete-orphan")
 
-    def to_dict(self):
+    __table_args__ = (
+        # Browse: active campaigns, NOCASE name prefix search and name-ordered keyset paging
+        db.Index("ix_campaigns_active_name", "is_active", db.collate(name, "NOCASE")),
+        # DM dashboard (own campaigns, newest first) and the admin list
+        db.Index("ix_campaigns_dm_created", "dm_id", "created_at"),
+        db.Index("ix_campaigns_created", "created_at"),
+    )
+
+    @classmethod
+    def counts_for(cls, ids) -> dict[int, "CampaignCounts"]:
+        """
+        {campaign_id: CampaignCounts} for many campaigns in one query: each side is a single
+        GROUP BY over the campaign_id column, so the cost is one statement however many rows.
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        approved = CampaignMembership.approved.is_(True)
+        members = (db.select(
+                       CampaignMembership.campaign_id,
+                       db.func.count().filter(approved, CampaignMembership.role == "player").label("players"),
+                       db.func.count().filter(approved).label("members"))
+                   .where(CampaignMembership.campaign_id.in_(ids))
+                   .group_by(CampaignMembership.campaign_id)
+                   .subquery())
+        chars = (db.select(
+                     Character.campaign_id,
+                     db.func.count().filter(Character.is_npc.is_(False)).label("pcs"),
+                     db.func.count().filter(Character.is_npc.is_(True)).label("npcs"))
+                 .where(Character.campaign_id.in_(ids))
+                 .group_by(Character.campaign_id)
+                 .subquery())
+        rows = db.session.execute(
+            db.select(cls.id,
+                      db.func.coalesce(members.c.players, 0), db.func.coalesce(members.c.members, 0),
+                      db.func.coalesce(chars.c.pcs, 0), db.func.coalesce(chars.c.npcs, 0))
+            .outerjoin(members, members.c.campaign_id == cls.id)
+            .outerjoin(chars, chars.c.campaign_id == cls.id)
+            .where(cls.id.in_(ids))
+        )
+        return {row[0]: CampaignCounts(*row[1:]) for row in rows}
+
+    def to_dict(self, counts: "CampaignCounts | None" = None):
+        """Pass `counts` from counts_for() when serialising many campaigns; otherwise one aggregate query."""
+        if counts is None:
+            counts = self.counts_for([self.id]).get(self.id, CampaignCounts())
         return {
             "id": self.id, "name": self.name, "description": self.description,
             "dm_id": self.dm_id,
             "dm_name": self.dm.display_name or self.dm.username if self.dm else "Unknown",
-            "player_count": len([m for m in self.memberships if m.role == "player" and m.approved]),
-            "character_count": len([c for c in self.characters if not c.is_npc]),
+            "player_count": counts.players,
+            "character_count": counts.pcs,
+            "npc_count": counts.npcs,
             "created_at": self.created_at.isoformat(),
         }
 
 
+class CampaignCounts(NamedTuple):
+    players: int = 0   # approved memberships with role "player"
+    members: int = 0   # all approved memberships
+    pcs: int = 0
+    npcs: int = 0
+
+
 class CampaignMembership(db.Model):
     __tablename__ = "campaign_memberships"
     id = db.Column(db.Integer, primary_key=True)
@@ -53,7 +119,10 @@ class CampaignMembership(db.Model):
     approved = db.Column(db.Boolean, default=False, nullable=False)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
-    __table_args__ = (db.UniqueConstraint("campaign_id", "user_id"),)
+    __table_args__ = (
+        db.UniqueConstraint("campaign_id", "user_id"),  # also serves per-campaign lookups and counts
+        db.Index("ix_memberships_user_approved", "user_id", "approved"),
+    )
 
 
 class CharacterTemplate(db.Model):
@@ -90,6 +159,9 @@ class CharacterTemplate(db.Model):
     times_used = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Template library: owner's PC or NPC templates, most used first
+    __table_args__ = (db.Index("ix_templates_owner_kind_used", "owner_id", "is_npc_template", "times_used"),)
+
     def to_dict(self):
         import json
         return {
@@ -114,6 +186,157 @@ class CharacterTemplate(db.Model):
         }
 
 
+class NpcJob(db.Model):
+    """
+    Background AI job (NPC generation or a PDF sheet read). Persisted so queued/running work survives a restart.
+    status: queued | running | done | failed
+    """
+    __tablename__ = "npc_jobs"
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False, default="single")  # single | batch | sheet
+    description = db.Column(db.Text, nullable=False)
+    params_json = db.Column(db.Text, default="{}")
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)
+    result_json = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        import json
+        d = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        result = json.loads(self.result_json) if self.result_json else None
+        if self.kind == "batch":
+            d["npcs"] = (result or {}).get("npcs", [])
+            d["character_ids"] = (result or {}).get("character_ids", [])
+        elif self.kind == "sheet":
+            d["character_id"] = (result or {}).get("character_id")
+        else:
+            d["npc"] = result
+        return d
+
+
+class PdfBlob(db.Model):
+    """
+    One stored PDF, content-addressed by SHA-256, with its extraction cached for every upload of the
+    same bytes. refcount is the number of pdf_ingestions rows pointing at it; the file and cache go at 0.
+    status: new | extracting | partial (some pages timed out) | ready
+    """
+    __tablename__ = "pdf_blobs"
+    sha256 = db.Column(db.String(64), primary_key=True)
+    stored_path = db.Column(db.String(500), nullable=False)
+    size_bytes = db.Column(db.Integer, default=0, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="new")
+    pages_total = db.Column(db.Integer, nullable=True)
+    pages_failed = db.Column(db.Integer, default=0, nullable=False)
+    fields_json = db.Column(db.Text, nullable=True)        # AcroForm values, {} for flat PDFs
+    refcount = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    extracted_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)    # extractor's last progress while "extracting"
+
+    pages = db.relationship("PdfPage", backref="blob", lazy="dynamic", cascade="all, delete-orphan",
+                            order_by="PdfPage.page_no")
+
+    def text(self) -> str:
+        return "\n\n".join(p.text for p in self.pages if p.text).strip()
+
+    def fields(self) -> dict:
+        import json
+        return json.loads(self.fields_json) if self.fields_json else {}
+
+
+class PdfIngestion(db.Model):
+    """
+    One upload of a PDF being turned into text, page by page, in the background.
+    Pages come from the blob's cache when the same file was extracted before.
+    status: queued | running | done | failed
+    """
+    __tablename__ = "pdf_ingestions"
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    sha256 = db.Column(db.String(64), db.ForeignKey("pdf_blobs.sha256"), nullable=True, index=True)
+    filename = db.Column(db.String(255), nullable=False)      # original name, display only
+    stored_path = db.Column(db.String(500), nullable=False)
+    size_bytes = db.Column(db.Integer, default=0, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)
+    cached = db.Column(db.Boolean, default=False, nullable=False)   # served from an earlier extraction
+    pages_total = db.Column(db.Integer, nullable=True)
+    pages_done = db.Column(db.Integer, default=0, nullable=False)
+    pages_failed = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)    # coordinator's last sign of life while "running"
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    blob = db.relationship("PdfBlob")
+
+    def text(self) -> str:
+        return self.blob.text() if self.blob else ""
+
+    def to_dict(self):
+        return {
+            "ingestion_id": self.id,
+            "filename": self.filename,
+            "sha256": self.sha256,
+            "status": self.status,
+            "cached": self.cached,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "pages_failed": self.pages_failed,
+            "progress": round(self.pages_done / self.pages_total, 3) if self.pages_total else 0.0,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class PdfPage(db.Model):
+    """Extracted text of one page of a stored PDF, written as soon as that page finishes. status: ok | timeout | error"""
+    __tablename__ = "pdf_pages"
+    sha256 = db.Column(db.String(64), db.ForeignKey("pdf_blobs.sha256"), primary_key=True)
+    page_no = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="ok")
+    text = db.Column(db.Text, nullable=True)
+    elapsed_ms = db.Column(db.Integer, default=0, nullable=False)
+
+
+# Character.sheet_doc layout. Bump SHEET_DOC_VERSION and extend upgrade_sheet_doc() when it changes;
+# stored documents are upgraded as they are read.
+SHEET_DOC_VERSION = 1
+SHEET_DOC_SECTIONS = {
+    "skills": dict, "saving_throws": dict, "equipment": list, "spells": dict,
+    "features": list, "traits": dict, "attacks": list,
+}
+
+
+def new_sheet_doc(**sections) -> dict:
+    doc = {"v": SHEET_DOC_VERSION, **{key: kind() for key, kind in SHEET_DOC_SECTIONS.items()}}
+    doc.update(sections)
+    return doc
+
+
+def upgrade_sheet_doc(doc) -> dict:
+    """A stored sheet document at the current version, with every section present and well-typed."""
+    doc = dict(doc) if isinstance(doc, dict) else {}
+    for key, kind in SHEET_DOC_SECTIONS.items():
+        if not isinstance(doc.get(key), kind):
+            doc[key] = kind()
+    doc["v"] = SHEET_DOC_VERSION
+    return doc
+
+
 class Character(db.Model):
     __tablename__ = "characters"
     id = db.Column(db.Integer, primary_key=True)
@@ -146,13 +369,9 @@ class Character(db.Model):
     proficiency_bonus = db.Column(db.Integer, default=2)
     hit_dice = db.Column(db.String(20), nullable=True)
 
-    skills_json = db.Column(db.Text, default="{}")
-    saving_throws_json = db.Column(db.Text, default="{}")
-    equipment_json = db.Column(db.Text, default="[]")
-    spells_json = db.Column(db.Text, default="{}")
-    features_json = db.Column(db.Text, default="[]")
-    traits_json = db.Column(db.Text, default="{}")
-    attacks_json = db.Column(db.Text, default="[]")
+    # Skills, saves, equipment, spells, features, traits and attacks as one versioned JSON document
+    # (see SHEET_DOC_SECTIONS). Deferred: card and list queries never load it; read it through .sheet.
+    sheet_doc = db.deferred(db.Column(db.JSON, nullable=False, default=new_sheet_doc))
     notes = db.Column(db.Text, nullable=True)
 
     build_step = db.Column(db.Integer, default=0)
@@ -161,47 +380,118 @@ class Character(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Campaign view and PC/NPC counts; player's own characters (optionally per campaign)
+        db.Index("ix_characters_campaign_npc", "campaign_id", "is_npc"),
+        db.Index("ix_characters_owner_campaign", "owner_id", "campaign_id"),
+    )
+
     def ability_modifier(self, score: int) -> int:
         return (score - 10) // 2
 
+    @classmethod
+    def cards_for(cls, *criteria, order_by=None) -> list["CharacterCard"]:
+        """
+        CharacterCards for every character matching `criteria`: selects only the card columns
+        into plain tuples, so lists skip the sheet document and notes and build no ORM objects.
+        """
+        query = db.select(*(getattr(cls, f) for f in CharacterCard._fields)).where(*criteria)
+        query = query.order_by(*(order_by if order_by is not None else (cls.id,)))
+        return [CharacterCard(*row) for row in db.session.execute(query)]
+
     def to_card_dict(self):
-        return {
-            "id": self.id, "name": self.name, "level": self.level,
-            "char_class": self.char_class or "—", "race": self.race or "—",
-            "background": self.background or "—",
-            "current_hp": self.current_hp, "max_hp": self.max_hp,
-            "armor_class": self.armor_class, "is_npc": self.is_npc,
-            "build_complete": self.build_complete, "owner_id": self.owner_id,
-        }
+        return CharacterCard(*(getattr(self, f) for f in CharacterCard._fields)).to_card_dict()
+
+    @property
+    def sheet(self) -> dict:
+        """sheet_doc upgraded to the current version, built once per instance. Treat as read-only; use update_sheet()."""
+        doc = self.__dict__.get("_sheet_cache")
+        if doc is None:
+            doc = self._sheet_cache = upgrade_sheet_doc(self.sheet_doc)
+        return doc
+
+    def update_sheet(self, **sections) -> None:
+        """Replace whole sections of the sheet document (assignment, so the change is flushed)."""
+        self.sheet_doc = {**self.sheet, **sections}
 
     def to_sheet_dict(self):
-        import json
+        from services import rules_service
+        doc = self.sheet
+        skills = doc["skills"]
+        saving_throws = doc["saving_throws"]
+        scores = (self.strength, self.dexterity, self.constitution,
+                  self.intelligence, self.wisdom, self.charisma)
+        lines = rules_service.sheet_lines(
+            scores, self.proficiency_bonus or 2,
+            frozenset(k for k, v in skills.items() if v),
+            frozenset(k for k, v in saving_throws.items() if v),
+        )
+        mods = lines.modifiers
         d = self.to_card_dict()
         d.update({
             "strength": self.strength, "dexterity": self.dexterity,
             "constitution": self.constitution, "intelligence": self.intelligence,
             "wisdom": self.wisdom, "charisma": self.charisma,
-            "str_mod": self.ability_modifier(self.strength),
-            "dex_mod": self.ability_modifier(self.dexterity),
-            "con_mod": self.ability_modifier(self.constitution),
-            "int_mod": self.ability_modifier(self.intelligence),
-            "wis_mod": self.ability_modifier(self.wisdom),
-            "cha_mod": self.ability_modifier(self.charisma),
+            "str_mod": mods[0], "dex_mod": mods[1], "con_mod": mods[2],
+            "int_mod": mods[3], "wis_mod": mods[4], "cha_mod": mods[5],
+            "save_lines": lines.saves, "skill_lines": lines.skills,
+            "passive_perception": lines.passive_perception,
             "temp_hp": self.temp_hp, "initiative": self.initiative,
             "speed": self.speed, "proficiency_bonus": self.proficiency_bonus,
             "hit_dice": self.hit_dice, "alignment": self.alignment,
             "experience_points": self.experience_points, "subclass": self.subclass,
-            "skills": json.loads(self.skills_json or "{}"),
-            "saving_throws": json.loads(self.saving_throws_json or "{}"),
-            "equipment": json.loads(self.equipment_json or "[]"),
-            "spells": json.loads(self.spells_json or "{}"),
-            "features": json.loads(self.features_json or "[]"),
-            "traits": json.loads(self.traits_json or "{}"),
-            "attacks": json.loads(self.attacks_json or "[]"),
+            "skills": skills,
+            "saving_throws": saving_throws,
+            "equipment": doc["equipment"],
+            "spells": doc["spells"],
+            "features": doc["features"],
+            "traits": doc["traits"],
+            "attacks": doc["attacks"],
             "notes": self.notes,
         })
         return d
 
+    @classmethod
+    def from_npc_dict(cls, npc: dict, campaign_id: int | None = None) -> "Character":
+        """Build an NPC row from an AI-generated stat block (see ollama_service.generate_npc)."""
+        from services import rules_service
+
+        def num(key, default, lo, hi):
+            try:
+                return max(lo, min(hi, int(npc.get(key, default))))
+            except (TypeError, ValueError):
+                return default
+
+        level = num("level", 1, 1, 30)
+        max_hp = num("max_hp", 1, 1, 9999)
+        # The AI already chose final scores; take proficiency/initiative from the engine
+        scores = tuple(num(a, 10, 1, 30) for a in rules_service.ABILITIES)
+        stats = rules_service.derive(scores, npc.get("race"), npc.get("char_class"), None, level,
+                                     apply_racial_bonuses=False)
+        notes = str(npc.get("notes") or "")
+        if npc.get("reasoning"):
+            notes += f"\n\n[AI reasoning: {npc['reasoning']}]"
+        return cls(
+            owner_id=None, campaign_id=campaign_id, is_npc=True,
+            name=str(npc.get("name") or "(unnamed)")[:200],
+            level=level,
+            char_class=str(npc.get("char_class") or "")[:80] or None,
+            race=str(npc.get("race") or "")[:80] or None,
+            alignment=str(npc.get("alignment") or "")[:40] or None,
+            strength=scores[0], dexterity=scores[1], constitution=scores[2],
+            intelligence=scores[3], wisdom=scores[4], charisma=scores[5],
+            max_hp=max_hp, current_hp=max_hp,
+            armor_class=num("armor_class", stats.armor_class, 1, 40),
+            initiative=stats.initiative,
+            speed=num("speed", stats.speed, 0, 200),
+            proficiency_bonus=stats.proficiency_bonus,
+            hit_dice=stats.hit_dice if stats.features else None,
+            sheet_doc=new_sheet_doc(saving_throws={s: True for s in stats.save_proficiencies},
+                                    features=list(stats.features)),
+            build_complete=True,
+            notes=notes.strip(),
+        )
+
     def to_template(self, template_name: str, description: str = "") -> CharacterTemplate:
         """Snapshot this character into a reusable template."""
         import json
@@ -218,6 +508,48 @@ class Character(db.Model):
             strength=self.strength, dexterity=self.dexterity,
             constitution=self.constitution, intelligence=self.intelligence,
             wisdom=self.wisdom, charisma=self.charisma,
-            traits_json=self.traits_json or "{}",
+            traits_json=json.dumps(self.sheet["traits"]),
             notes=self.notes,
         )
+
+
+class CharacterCard(NamedTuple):
+    """The columns a character card shows (campaign PC/NPC lists); see Character.cards_for()."""
+    id: int
+    name: str
+    level: int
+    char_class: str | None
+    race: str | None
+    background: str | None
+    current_hp: int
+    max_hp: int
+    armor_class: int
+    is_npc: bool
+    build_complete: bool
+    owner_id: int | None
+
+    def to_card_dict(self):
+        return {
+            "id": self.id, "name": self.name, "level": self.level,
+            "char_class": self.char_class or "—", "race": self.race or "—",
+            "background": self.background or "—",
+            "current_hp": self.current_hp, "max_hp": self.max_hp,
+            "armor_class": self.armor_class, "is_npc": self.is_npc,
+            "build_complete": self.build_complete, "owner_id": self.owner_id,
+        }
+
+
+# Character.sheet caches the upgraded document; drop it whenever sheet_doc is replaced or reloaded
+@event.listens_for(Character.sheet_doc, "set")
+def _sheet_doc_set(target, value, oldvalue, initiator):
+    target.__dict__.pop("_sheet_cache", None)
+
+@event.listens_for(Character, "expire")
+def _sheet_doc_expired(target, attrs):
+    if attrs is None or "sheet_doc" in attrs:
+        target.__dict__.pop("_sheet_cache", None)
+
+@event.listens_for(Character, "refresh")
+def _sheet_doc_refreshed(target, context, attrs):
+    if attrs is None or "sheet_doc" in attrs:
+        target.__dict__.pop("_sheet_cache", None)
@@ -1,8 +1,10 @@
 from __future__ import annotations
-from flask import Blueprint, render_template, redirect, url_for, session, flash, request
+from flask import Blueprint, render_template, redirect, url_for, session, flash, request, jsonify
 from db import db
 from models import User, Campaign, CampaignMembership, Character
-from services.auth_service import hash_password
+from services.auth_service import hash_password, get_verifier
+from services import ollama_service
+from services.cache_service import get_cache
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -12,19 +14,80 @@ def _require_admin():
         return False
     return True
 
+ADMIN_PAGE_SIZE = 25
+ROLES = ("admin", "dm", "player")
+
+def _page_arg(name: str) -> int:
+    return max(1, request.args.get(name, 1, type=int) or 1)
+
+def _paginate(stmt, page: int, per_page: int = ADMIN_PAGE_SIZE) -> dict:
+    """LIMIT/OFFSET page of a column-projected select plus one COUNT over the same filters."""
+    total = db.session.scalar(db.select(db.func.count()).select_from(stmt.order_by(None).subquery()))
+    pages = max(1, -(-total // per_page))
+    page = min(page, pages)
+    items = db.session.execute(stmt.limit(per_page).offset((page - 1) * per_page)).all()
+    return {"items": items, "page": page, "pages": pages, "total": total,
+            "has_prev": page > 1, "has_next": page < pages}
+
+def _search(column, q: str):
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+def _user_page(q: str, role: str, page: int) -> dict:
+    stmt = db.select(User.id, User.username, User.display_name, User.role)
+    if role in ROLES:
+        stmt = stmt.where(User.role == role)
+    if q:
+        stmt = stmt.where(db.or_(_search(User.username, q), _search(User.display_name, q)))
+    return _paginate(stmt.order_by(User.role, User.username), page)
+
+def _campaign_page(q: str, page: int) -> dict:
+    stmt = (db.select(Campaign.id, Campaign.name,
+                      db.func.coalesce(User.display_name, User.username).label("dm_name"))
+            .outerjoin(User, User.id == Campaign.dm_id))
+    if q:
+        stmt = stmt.where(_search(Campaign.name, q))
+    return _paginate(stmt.order_by(Campaign.created_at.desc(), Campaign.id.desc()), page)
+
+def _count(model) -> int:
+    return db.session.scalar(db.select(db.func.count()).select_from(model))
+
+def _page_json(page: dict) -> dict:
+    return {**page, "items": [row._asdict() for row in page["items"]]}
+
 @admin_bp.get("/")
 def dashboard():
     if not _require_admin():
         return redirect(url_for("auth.login_get"))
-    users = User.query.order_by(User.role, User.username).all()
-    campaigns = Campaign.query.order_by(Campaign.created_at.desc()).all()
+    uq = (request.args.get("uq") or "").strip()
+    role = (request.args.get("role") or "").strip()
+    cq = (request.args.get("cq") or "").strip()
     return render_template("admin/dashboard.html",
-        users=users, campaigns=campaigns,
-        user_count=len(users),
-        campaign_count=len(campaigns),
-        char_count=Character.query.count()
+        users=_user_page(uq, role, _page_arg("upage")),
+        campaigns=_campaign_page(cq, _page_arg("cpage")),
+        uq=uq, role=role, cq=cq,
+        user_count=_count(User),
+        campaign_count=_count(Campaign),
+        char_count=_count(Character),
     )
 
+@admin_bp.get("/api/users")
+def api_users():
+    """Paged user rows (only the columns the admin table shows). ?q=&role=&page="""
+    if session.get("role") != "admin":
+        return jsonify({"error": "Admin access required"}), 403
+    q = (request.args.get("q") or "").strip()
+    role = (request.args.get("role") or "").strip()
+    return jsonify(_page_json(_user_page(q, role, _page_arg("page"))))
+
+@admin_bp.get("/api/campaigns")
+def api_campaigns():
+    """Paged campaign rows with the DM's display name. ?q=&page="""
+    if session.get("role") != "admin":
+        return jsonify({"error": "Admin access required"}), 403
+    q = (request.args.get("q") or "").strip()
+    return jsonify(_page_json(_campaign_page(q, _page_arg("page"))))
+
 @admin_bp.post("/users/create")
 def create_user():
     if not _require_admin():
@@ -114,3 +177,22 @@ def delete_campaign(cid: int):
     db.session.commit()
     flash(f"Campaign '{c.name}' deleted.", "ok")
     return redirect(url_for("admin.dashboard"))
+
+@admin_bp.get("/ollama_stats")
+def ollama_stats():
+    """Connection reuse, upstream latency, cached health and reply-cache counters for the AI backend."""
+    if session.get("role") != "admin":
+        return jsonify({"error": "Admin access required"}), 403
+    stats = ollama_service.get_client().stats()
+    monitor = ollama_service.get_health_monitor()
+    stats["health"] = monitor.status() if monitor else None
+    stats["reply_cache"] = get_cache().stats()
+    return jsonify(stats)
+
+@admin_bp.get("/auth_stats")
+def auth_stats():
+    """bcrypt pool load, shed/timeout counters and verify latency percentiles for login sizing."""
+    if session.get("role") != "admin":
+        return jsonify({"error": "Admin access required"}), 403
+    verifier = get_verifier()
+    return jsonify(verifier.stats() if verifier else {"error": "Password verifier not running"})
@@ -1,53 +1,182 @@
 from __future__ import annotations
-from pathlib import Path
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, session, current_app,
+                   jsonify, Response, stream_with_context)
 from db import db
-from models.character import Character
-from services.pdf_service import extract_text_from_pdf
-from services.ollama_service import ollama_health
+from models import Character, NpcJob, PdfIngestion, PdfPage
+from services import sheet_import_service
+from services.ingest_service import get_queue
+from services.job_service import get_queue as get_job_queue
+from services.ollama_service import ollama_health_cached
 
 builder_bp = Blueprint("builder", __name__, url_prefix="/builder")
 
 def _require_login():
-    return bool(session.get("user_id"))
+    if not session.get("user_id"):
+        flash("Please log in.", "error")
+        return False
+    return True
+
+def _wants_json() -> bool:
+    return request.accept_mimetypes.best == "application/json" or request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+def _own_ingestion(ingestion_id: str) -> PdfIngestion | None:
+    ing = db.session.get(PdfIngestion, ingestion_id)
+    if not ing or (ing.user_id != session.get("user_id") and session.get("role") != "admin"):
+        return None
+    return ing
 
 @builder_bp.get("/upload")
 def upload():
     if not _require_login():
-        return redirect(url_for("auth.login_form"))
+        return redirect(url_for("auth.login_get"))
 
-    ok = ollama_health(current_app.config["OLLAMA_URL"])
-    return render_template("builder/upload.html", ollama_ok=ok)
+    ok = ollama_health_cached(current_app.config["OLLAMA_URL"])
+    recent = (PdfIngestion.query.filter_by(user_id=session["user_id"])
+              .order_by(PdfIngestion.created_at.desc()).limit(10).all())
+    return render_template("builder/upload.html", ollama_ok=ok, ingestions=recent,
+                           highlight=request.args.get("ingestion"))
 
 @builder_bp.post("/upload")
 def upload_post():
-    if not _require_login():
-        return redirect(url_for("auth.login_form"))
+    """Save the PDF and queue it for extraction; returns at once (202 for API callers)."""
+    if not session.get("user_id"):
+        if _wants_json():
+            return jsonify({"error": "Not logged in"}), 401
+        return redirect(url_for("auth.login_get"))
 
     f = request.files.get("pdf")
-    if not f or not f.filename.lower().endswith(".pdf"):
+    if not f or not (f.filename or "").lower().endswith(".pdf"):
+        if _wants_json():
+            return jsonify({"error": "Please choose a PDF file."}), 400
         flash("Please choose a PDF file.", "error")
         return redirect(url_for("builder.upload"))
 
-    upload_dir = Path(current_app.config["UPLOAD_FOLDER"])
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    ing = get_queue().submit(session["user_id"], f)
+    if isinstance(ing, str):
+        if _wants_json():
+            return jsonify({"ok": False, "error": ing}), 429 if "already" in ing else 400
+        flash(ing, "error")
+        return redirect(url_for("builder.upload"))
+
+    if _wants_json():
+        return jsonify({
+            "ok": True, "ingestion_id": ing.id, "status": ing.status, "cached": ing.cached,
+            "status_url": url_for("builder.ingestion_status", ingestion_id=ing.id),
+        }), 202
+    if ing.cached:
+        flash(f"Uploaded {ing.filename}. This file was read before, so its text is ready.", "ok")
+    else:
+        flash(f"Uploaded {ing.filename}. Extracting text in the background.", "ok")
+    return redirect(url_for("builder.upload", ingestion=ing.id))
+
+@builder_bp.get("/ingestions/<ingestion_id>")
+def ingestion_status(ingestion_id: str):
+    """Progress of one PDF ingestion."""
+    if not session.get("user_id"):
+        return jsonify({"error": "Not logged in"}), 401
+    ing = _own_ingestion(ingestion_id)
+    if not ing:
+        return jsonify({"error": "Upload not found"}), 404
+    return jsonify({"ok": ing.status != "failed", **ing.to_dict(),
+                    "text_url": url_for("builder.ingestion_text", ingestion_id=ing.id)})
+
+@builder_bp.get("/ingestions/<ingestion_id>/text")
+def ingestion_text(ingestion_id: str):
+    """Extracted text, streamed page by page (pages still being worked on are simply not there yet)."""
+    if not session.get("user_id"):
+        return jsonify({"error": "Not logged in"}), 401
+    ing = _own_ingestion(ingestion_id)
+    if not ing:
+        return jsonify({"error": "Upload not found"}), 404
+
+    def pages():
+        query = (db.select(PdfPage.page_no, PdfPage.status, PdfPage.text)
+                 .where(PdfPage.sha256 == ing.sha256).order_by(PdfPage.page_no)
+                 .execution_options(yield_per=20))
+        for page_no, status, text in db.session.execute(query):
+            yield f"--- page {page_no + 1}" + ("" if status == "ok" else f" ({status})") + " ---\n"
+            yield (text or "") + "\n\n"
+
+    return Response(stream_with_context(pages()), mimetype="text/plain; charset=utf-8")
+
+@builder_bp.post("/ingestions/<ingestion_id>/delete")
+def delete_ingestion(ingestion_id: str):
+    """Forget an upload; the stored file goes once no other upload uses the same bytes."""
+    if not _require_login():
+        return redirect(url_for("auth.login_get"))
+    ing = _own_ingestion(ingestion_id)
+    if not ing:
+        flash("Upload not found.", "error")
+        return redirect(url_for("builder.upload"))
+    error = get_queue().delete(ing)
+    flash(error or "Upload removed.", "error" if error else "ok")
+    return redirect(url_for("builder.upload"))
+
+@builder_bp.post("/ingestions/<ingestion_id>/character")
+def create_character(ingestion_id: str):
+    """
+    Build a character from an uploaded sheet. Fillable PDFs are mapped from their form fields
+    (cached once the ingest worker has read the file) right here; flat PDFs wait for the text and
+    are queued for an AI read, polled through character_import_status. The PDF itself is never
+    parsed here.
+    """
+    if not session.get("user_id"):
+        if _wants_json():
+            return jsonify({"error": "Not logged in"}), 401
+        flash("Please log in.", "error")
+        return redirect(url_for("auth.login_get"))
+
+    def fail(message: str, code: int):
+        if _wants_json():
+            return jsonify({"error": message}), code
+        flash(message, "error")
+        return redirect(url_for("builder.upload", ingestion=ingestion_id))
 
-    safe_name = f.filename.replace("..", ".").replace("/", "_").replace("\\", "_")
-    out_path = upload_dir / safe_name
-    f.save(str(out_path))
+    ing = _own_ingestion(ingestion_id)
+    if not ing or not ing.blob:
+        return fail("Upload not found.", 404)
 
-    raw_text = extract_text_from_pdf(str(out_path))
+    blob = ing.blob
+    if blob.fields_json is None:
+        if ing.status == "failed":
+            return fail("Could not read this PDF.", 422)
+        return fail("This PDF is still being read; try again in a moment.", 409)
+    cols = sheet_import_service.from_form_fields(blob.fields())
+    if cols is None:
+        if ing.status != "done":
+            return fail("This PDF has no fillable fields; wait for its text to finish extracting.", 409)
+        if not ollama_health_cached(current_app.config["OLLAMA_URL"]):
+            return fail("This PDF has no fillable fields, and reading it needs the AI, which is not reachable.", 503)
+        job = get_job_queue().submit(session["user_id"], ing.filename, kind="sheet",
+                                     params={"ingestion_id": ing.id})
+        if isinstance(job, str):
+            return fail(job, 429)
+        if _wants_json():
+            return jsonify({
+                "ok": True, "job_id": job.id, "status": job.status,
+                "status_url": url_for("builder.character_import_status", job_id=job.id),
+            }), 202
+        flash(f"Reading {ing.filename} with the AI. The character will appear under My Characters when it is done.", "ok")
+        return redirect(url_for("builder.upload", ingestion=ing.id))
 
-    c = Character(
-        owner_id=session.get("user_id"),
-        source="pdf",
-        pdf_filename=safe_name,
-        raw_text=raw_text if raw_text else None,
-        parsed=None,
-        name=None,
-    )
-    db.session.add(c)
+    char = Character(owner_id=session["user_id"], is_npc=False, build_complete=True, **cols)
+    db.session.add(char)
     db.session.commit()
+    sheet_url = url_for("characters.sheet", cid=char.id)
+    if _wants_json():
+        return jsonify({"ok": True, "character_id": char.id, "status": "done", "sheet_url": sheet_url}), 201
+    flash(f"Character '{char.name}' imported from {ing.filename} (form fields).", "ok")
+    return redirect(sheet_url)
 
-    flash("PDF uploaded. Next: approval + mapping (we build next).", "ok")
-    return redirect(url_for("characters.list_characters"))
\ No newline at end of file
+@builder_bp.get("/imports/<job_id>")
+def character_import_status(job_id: str):
+    """Progress of a queued AI sheet read; sheet_url is set once the character exists."""
+    if not session.get("user_id"):
+        return jsonify({"error": "Not logged in"}), 401
+    job = db.session.get(NpcJob, job_id)
+    if not job or job.kind != "sheet" or (job.user_id != session["user_id"] and session.get("role") != "admin"):
+        return jsonify({"error": "Import not found"}), 404
+    d = job.to_dict()
+    if d.get("character_id"):
+        d["sheet_url"] = url_for("characters.sheet", cid=d["character_id"])
+    return jsonify({"ok": job.status != "failed", **d})
@@ -1,7 +1,10 @@
 from __future__ import annotations
-from flask import Blueprint, render_template, redirect, url_for, session, flash
+from flask import Blueprint, render_template, redirect, url_for, session, flash, Response
+from werkzeug.utils import secure_filename
 from db import db
-from models import Campaign, CampaignMembership, Character, User
+from sqlalchemy.orm import joinedload
+from models import Campaign, CampaignMembership, Character
+from services.sheet_pdf_service import get_sheet_pdfs
 
 campaigns_bp = Blueprint("campaigns", __name__, url_prefix="/campaigns")
 
@@ -25,7 +28,7 @@ def _can_access_campaign(campaign: Campaign) -> bool:
 def view(cid: int):
     if not _require_login():
         return redirect(url_for("auth.login_get"))
-    campaign = Campaign.query.get_or_404(cid)
+    campaign = Campaign.query.options(joinedload(Campaign.dm)).filter_by(id=cid).first_or_404()
     if not _can_access_campaign(campaign):
         flash("You don't have access to this campaign.", "error")
         return redirect(url_for("auth.login_get"))
@@ -34,21 +37,25 @@ def view(cid: int):
     role = session.get("role")
     is_dm = (campaign.dm_id == uid or role == "admin")
 
-    # Get all characters in campaign
-    pc_chars = Character.query.filter_by(campaign_id=cid, is_npc=False).all()
-    npc_chars = Character.query.filter_by(campaign_id=cid, is_npc=True).all()
+    # All characters in campaign, one query over the card columns only
+    chars = Character.cards_for(Character.campaign_id == cid)
+    pc_chars = [c for c in chars if not c.is_npc]
+    npc_chars = [c for c in chars if c.is_npc]
 
-    # Membership info (for DM panel)
+    # Membership info (for DM panel), users joined in the same query
     members = []
     pending = []
     if is_dm:
-        approved_memberships = CampaignMembership.query.filter_by(campaign_id=cid, approved=True).all()
-        pending_memberships = CampaignMembership.query.filter_by(campaign_id=cid, approved=False).all()
-        members = [(m, User.query.get(m.user_id)) for m in approved_memberships]
-        pending = [(m, User.query.get(m.user_id)) for m in pending_memberships]
+        memberships = (CampaignMembership.query
+                       .options(joinedload(CampaignMembership.user))
+                       .filter_by(campaign_id=cid)
+                       .order_by(CampaignMembership.id)
+                       .all())
+        members = [(m, m.user) for m in memberships if m.approved]
+        pending = [(m, m.user) for m in memberships if not m.approved]
 
     # My character in this campaign
-    my_char = Character.query.filter_by(campaign_id=cid, owner_id=uid, is_npc=False).first()
+    my_char = next((c for c in pc_chars if c.owner_id == uid), None)
 
     return render_template("campaigns/view.html",
         campaign=campaign,
@@ -59,3 +66,25 @@ def view(cid: int):
         pending=pending,
         my_char=my_char,
     )
+
+@campaigns_bp.get("/<int:cid>/sheets.zip")
+def export_sheets(cid: int):
+    """Every PC and NPC sheet in the campaign as PDFs in one zip, streamed while rendering."""
+    if not _require_login():
+        return redirect(url_for("auth.login_get"))
+    campaign = Campaign.query.get_or_404(cid)
+    if campaign.dm_id != session.get("user_id") and session.get("role") != "admin":
+        flash("Only the campaign's DM can export every sheet.", "error")
+        return redirect(url_for("campaigns.view", cid=cid))
+
+    chars = (Character.query.options(db.undefer(Character.sheet_doc)).filter_by(campaign_id=cid)
+             .order_by(Character.is_npc, Character.name, Character.id).all())
+
+    def arcname(c: Character) -> str:
+        return f"{'NPCs' if c.is_npc else 'PCs'}/{secure_filename(c.name) or 'character'}-{c.id}.pdf"
+
+    cache = get_sheet_pdfs()
+    jobs = cache.prepare(chars, arcname)
+    filename = f"{secure_filename(campaign.name) or 'campaign'}-sheets.zip"
+    return Response(cache.stream_zip(jobs), mimetype="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"})
@@ -1,10 +1,15 @@
 from __future__ import annotations
 import json
-from flask import Blueprint, render_template, redirect, url_for, session, flash, request, jsonify, current_app
+import uuid
+from flask import Blueprint, render_template, redirect, url_for, session, flash, request, jsonify, current_app, Response, stream_with_context, send_file
+from werkzeug.utils import secure_filename
 from db import db
-from models import Character, Campaign, CampaignMembership
-from services import srd_service
-from services.ollama_service import step_prompt, ollama_chat, generate_npc, ollama_health
+from models import Character, Campaign, CampaignMembership, NpcJob, new_sheet_doc
+from services import srd_service, rules_service
+from services.cache_service import get_cache, reply_key
+from services.job_service import get_queue
+from services.sheet_pdf_service import get_sheet_pdfs
+from services.ollama_service import step_prompt, ollama_chat, ollama_chat_stream, ollama_health_cached, get_wizard_sessions
 
 characters_bp = Blueprint("characters", __name__, url_prefix="/characters")
 
@@ -69,8 +74,10 @@ def new():
         backgrounds=srd_service.SRD_BACKGROUNDS,
         alignments=srd_service.SRD_ALIGNMENTS,
         skills=srd_service.ALL_SKILLS,
-        ollama_ok=ollama_health(ollama_url),
+        racial_bonuses_json=srd_service.RACIAL_BONUSES_JSON,
+        ollama_ok=ollama_health_cached(ollama_url),
         preload=preload,
+        wizard_session=uuid.uuid4().hex,
     )
 
 @characters_bp.post("/create")
@@ -95,35 +102,31 @@ def create():
     level = max(1, min(30, int(f.get("level", 1) or 1)))
     alignment = f.get("alignment", "True Neutral")
 
-    srd_class = srd_service.get_class(class_name) or {}
-    hit_die = srd_class.get("hit_die", "d8")
-    prof = srd_service.proficiency_bonus(min(level, 20))
-    con_score = score("constitution")
-    dex_score = score("dexterity")
-    con_mod = srd_service.ability_modifier(con_score)
-    dex_mod = srd_service.ability_modifier(dex_score)
-    hit_die_val = int(hit_die[1:])
-    auto_hp = max(1, hit_die_val + con_mod + (level - 1) * (hit_die_val // 2 + 1 + con_mod))
-    auto_ac = 10 + dex_mod
+    # The wizard posts base scores (racial bonuses applied here); the quick NPC form posts final scores
+    stats = rules_service.derive(
+        tuple(score(a) for a in rules_service.ABILITIES), race_name, class_name, bg_name, level,
+        apply_racial_bonuses=f.get("apply_racial_bonuses", "false").lower() == "true",
+    )
 
     hp_override = f.get("hp_override", "").strip()
     ac_override = f.get("armor_class_override", "").strip()
-    max_hp = int(hp_override) if hp_override and hp_override.lstrip('-').isdigit() else auto_hp
+    max_hp = int(hp_override) if hp_override and hp_override.lstrip('-').isdigit() else stats.max_hp
     max_hp = max(1, max_hp)
-    armor_class = int(ac_override) if ac_override and ac_override.lstrip('-').isdigit() else auto_ac
-    speed = max(0, int(f.get("speed", 30) or 30))
+    speed_override = f.get("speed_override", "").strip()
+    armor_class = int(ac_override) if ac_override and ac_override.lstrip('-').isdigit() else stats.armor_class
+    speed = max(0, int(speed_override) if speed_override.isdigit() else stats.speed)
 
     # Personality fields
     personality_trait = f.get("personality_trait", "")
     ideal = f.get("ideal", "")
     bond = f.get("bond", "")
     flaw = f.get("flaw", "")
-    traits_json = json.dumps({
+    traits = {
         "personality": personality_trait,
         "ideal": ideal,
         "bond": bond,
         "flaw": flaw
-    })
+    }
 
     char = Character(
         owner_id=uid if not is_npc else None,
@@ -135,38 +138,31 @@ def create():
         race=race_name,
         background=bg_name,
         alignment=alignment,
-        strength=score("strength"),
-        dexterity=dex_score,
-        constitution=con_score,
-        intelligence=score("intelligence"),
-        wisdom=score("wisdom"),
-        charisma=score("charisma"),
+        strength=stats.score("strength"),
+        dexterity=stats.score("dexterity"),
+        constitution=stats.score("constitution"),
+        intelligence=stats.score("intelligence"),
+        wisdom=stats.score("wisdom"),
+        charisma=stats.score("charisma"),
         max_hp=max_hp,
         current_hp=max_hp,
         armor_class=armor_class,
+        initiative=stats.initiative,
         speed=speed,
-        proficiency_bonus=prof,
-        hit_dice=f"{level}{hit_die}",
+        proficiency_bonus=stats.proficiency_bonus,
+        hit_dice=stats.hit_dice,
         build_complete=True,
         notes=f.get("notes", ""),
-        traits_json=traits_json,
+        # Background skills + class saving throws
+        sheet_doc=new_sheet_doc(
+            skills={s: True for s in stats.skill_proficiencies},
+            saving_throws={s: True for s in stats.save_proficiencies},
+            equipment=list(stats.equipment),
+            features=list(stats.features),
+            traits=traits,
+        ),
     )
 
-    bg = srd_service.get_background(bg_name) or {}
-    # Merge background skills + any class skills
-    skills_dict = {s: True for s in bg.get("skill_proficiencies", [])}
-    char.skills_json = json.dumps(skills_dict)
-    char.equipment_json = json.dumps(bg.get("equipment", []))
-
-    feats = []
-    for lvl in range(1, min(level, 20) + 1):
-        feats.extend(srd_class.get("features_by_level", {}).get(lvl, []))
-    char.features_json = json.dumps(feats)
-
-    # Saving throw proficiencies from class
-    saves = srd_class.get("saving_throws", [])
-    char.saving_throws_json = json.dumps({s: True for s in saves})
-
     db.session.add(char)
     db.session.commit()
 
@@ -181,12 +177,24 @@ def create():
 def sheet(cid: int):
     if not _require_login():
         return redirect(url_for("auth.login_get"))
-    char = Character.query.get_or_404(cid)
+    char = Character.query.options(db.undefer(Character.sheet_doc)).filter_by(id=cid).first_or_404()
     return render_template("characters/sheet.html",
         char=char, data=char.to_sheet_dict(),
         can_edit=_can_edit_character(char),
         can_delete=_can_delete_character(char))
 
+@characters_bp.get("/<int:cid>/sheet.pdf")
+def sheet_pdf(cid: int):
+    """The character sheet as a PDF, rendered once per edit and then served from the disk cache."""
+    if not _require_login():
+        return redirect(url_for("auth.login_get"))
+    char = Character.query.get_or_404(cid)  # sheet_doc stays unloaded when the render is cached
+    path, key = get_sheet_pdfs().get_or_render(char)
+    resp = send_file(path, mimetype="application/pdf", download_name=f"{secure_filename(char.name) or 'character'}.pdf",
+                     etag=key, conditional=True, max_age=0)
+    resp.cache_control.private = True
+    return resp
+
 @characters_bp.post("/<int:cid>/delete")
 def delete(cid: int):
     if not _require_login():
@@ -199,6 +207,7 @@ def delete(cid: int):
     is_npc = char.is_npc
     db.session.delete(char)
     db.session.commit()
+    get_sheet_pdfs().discard(cid)
     flash("Character deleted.", "ok")
     if campaign_id:
         return redirect(url_for("campaigns.view", cid=campaign_id))
@@ -218,13 +227,71 @@ def ai_step():
 
     url = current_app.config["OLLAMA_URL"]
     model = current_app.config["OLLAMA_MODEL"]
-    messages = step_prompt(step, build, user_message)
+    uid = session["user_id"]
+    sid = str(data.get("session_id") or "")[:64]
+    sessions = get_wizard_sessions()
+    messages = step_prompt(step, build, user_message, sessions.history(sid, uid) if sid else None)
+    stream = data.get("stream") or "text/event-stream" in request.headers.get("Accept", "")
+
+    cache = get_cache()
+    key = reply_key(model, messages)
+
+    def finish(reply: str, from_cache: bool = False) -> None:
+        if not reply or "[AI unavailable" in reply:
+            return
+        if not from_cache:
+            cache.put(key, reply)
+        if sid:
+            sessions.record(sid, uid, messages[-1]["content"], reply)
+
+    cached = cache.get(key)
+    if cached is not None:
+        finish(cached, from_cache=True)
+        return _sse_response(iter([cached])) if stream else jsonify({"reply": cached, "cached": True})
+
+    if stream:
+        return _sse_response(_on_complete(ollama_chat_stream(url, model, messages), finish))
     reply = ollama_chat(url, model, messages)
+    finish(reply)
     return jsonify({"reply": reply})
 
+def _on_complete(tokens, callback):
+    """Pass tokens through; hand the joined reply to `callback` only if the stream finished cleanly."""
+    parts = []
+    try:
+        for token in tokens:
+            parts.append(token)
+            yield token
+    finally:
+        tokens.close()
+    callback("".join(parts).strip())
+
+def _sse_response(tokens):
+    """Relay a token generator to the browser as Server-Sent Events.
+
+    Each token is sent as `data: {"token": ...}`; a final `event: done`
+    tells the client the reply is complete. If the client goes away the
+    WSGI server closes this generator, which closes `tokens` and with it
+    the upstream Ollama request.
+    """
+    def events():
+        try:
+            for token in tokens:
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            if hasattr(tokens, "close"):
+                tokens.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @characters_bp.post("/ai_npc")
 def ai_npc():
-    """AI generates a full NPC stat block from a description."""
+    """Queue AI generation of a full NPC stat block; poll ai_npc_status for the result."""
     if not session.get("user_id"):
         return jsonify({"error": "Not logged in"}), 401
     role = session.get("role")
@@ -236,10 +303,67 @@ def ai_npc():
     if not description:
         return jsonify({"error": "Description required"}), 400
 
-    url = current_app.config["OLLAMA_URL"]
-    model = current_app.config["OLLAMA_MODEL"]
-    result = generate_npc(url, model, description)
+    job = get_queue().submit(session["user_id"], description)
+    if isinstance(job, str):
+        return jsonify({"ok": False, "error": job}), 429
+    return jsonify({
+        "ok": True, "job_id": job.id, "status": job.status,
+        "status_url": url_for("characters.ai_npc_status", job_id=job.id),
+    }), 202
 
-    if isinstance(result, dict):
-        return jsonify({"ok": True, "npc": result})
-    return jsonify({"ok": False, "error": result}), 500
+@characters_bp.post("/ai_npc_batch")
+def ai_npc_batch():
+    """
+    Queue generation of `count` NPCs from one description. With a campaign_id they are added to
+    that campaign when done; without one the job only returns the stat blocks.
+    """
+    if not session.get("user_id"):
+        return jsonify({"error": "Not logged in"}), 401
+    role = session.get("role")
+    if role not in ("dm", "admin"):
+        return jsonify({"error": "DM access required"}), 403
+
+    data = request.json or {}
+    description = (data.get("description") or "").strip()
+    if not description:
+        return jsonify({"error": "Description required"}), 400
+    max_count = current_app.config.get("NPC_BATCH_MAX", 20)
+    try:
+        count = int(data.get("count", 1))
+    except (TypeError, ValueError):
+        count = 0
+    if not 1 <= count <= max_count:
+        return jsonify({"error": f"Count must be between 1 and {max_count}"}), 400
+    variations = data.get("variations") or []
+    if isinstance(variations, str):
+        variations = [v.strip() for v in variations.split(",")]
+    variations = [str(v).strip() for v in variations if str(v).strip()][:max_count]
+
+    campaign_id = data.get("campaign_id")
+    if campaign_id is not None:
+        try:
+            campaign_id = int(campaign_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "campaign_id must be an integer"}), 400
+        campaign = db.session.get(Campaign, campaign_id)
+        if not campaign or (role != "admin" and campaign.dm_id != session["user_id"]):
+            return jsonify({"error": "Not your campaign"}), 403
+
+    job = get_queue().submit(session["user_id"], description, kind="batch",
+                             params={"count": count, "variations": variations, "campaign_id": campaign_id})
+    if isinstance(job, str):
+        return jsonify({"ok": False, "error": job}), 429
+    return jsonify({
+        "ok": True, "job_id": job.id, "status": job.status,
+        "status_url": url_for("characters.ai_npc_status", job_id=job.id),
+    }), 202
+
+@characters_bp.get("/ai_npc/<job_id>")
+def ai_npc_status(job_id: str):
+    """Current state of a queued NPC generation job."""
+    if not session.get("user_id"):
+        return jsonify({"error": "Not logged in"}), 401
+    job = db.session.get(NpcJob, job_id)
+    if not job or (job.user_id != session["user_id"] and session.get("role") != "admin"):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"ok": job.status != "failed", **job.to_dict()})
@@ -29,7 +29,8 @@ def dashboard():
         campaigns = Campaign.query.order_by(Campaign.created_at.desc()).all()
     else:
         campaigns = Campaign.query.filter_by(dm_id=uid).order_by(Campaign.created_at.desc()).all()
-    return render_template("dm/dashboard.html", campaigns=campaigns)
+    return render_template("dm/dashboard.html", campaigns=campaigns,
+                           counts=Campaign.counts_for(c.id for c in campaigns))
 
 @dm_bp.post("/campaigns/create")
 def create_campaign():
@@ -1,10 +1,13 @@
 from __future__ import annotations
 from flask import Blueprint, render_template, redirect, url_for, session, flash, request
 from db import db
+from sqlalchemy.orm import joinedload
 from models import Campaign, CampaignMembership, Character
 
 player_bp = Blueprint("player", __name__, url_prefix="/player")
 
+BROWSE_PAGE_SIZE = 24
+
 def _require_login():
     if not session.get("user_id"):
         flash("Please log in.", "error")
@@ -44,8 +47,29 @@ def browse_campaigns():
     if not _require_login():
         return redirect(url_for("auth.login_get"))
     uid = session.get("user_id")
-    # Show active campaigns player isn't already in
-    all_campaigns = Campaign.query.filter_by(is_active=True).all()
-    my_ids = {m.campaign_id for m in CampaignMembership.query.filter_by(user_id=uid).all()}
-    available = [c for c in all_campaigns if c.id not in my_ids]
-    return render_template("player/browse.html", campaigns=available)
+    q = (request.args.get("q") or "").strip()
+    # Keyset cursor: the (name, id) of the last row on the previous page; anything malformed means page one
+    after = request.args.get("after", type=int)
+    after_name = request.args.get("after_name")
+    if after is None or after_name is None:
+        after = after_name = None
+
+    # Active campaigns the player has no membership in (anti-join), name-ordered keyset pages
+    name_key = db.collate(Campaign.name, "NOCASE")
+    query = (Campaign.query
+             .options(joinedload(Campaign.dm))
+             .filter(Campaign.is_active.is_(True))
+             .filter(~db.exists().where(CampaignMembership.campaign_id == Campaign.id,
+                                        CampaignMembership.user_id == uid)))
+    if q:
+        # Prefix match as a range on the NOCASE index (LIKE with wildcards in q can't use it)
+        query = query.filter(name_key >= q, name_key < q + "\U0010ffff")
+    if after is not None:
+        query = query.filter(db.tuple_(name_key, Campaign.id) > db.tuple_(after_name, after))
+    page = query.order_by(name_key, Campaign.id).limit(BROWSE_PAGE_SIZE + 1).all()
+
+    next_after = page[BROWSE_PAGE_SIZE - 1] if len(page) > BROWSE_PAGE_SIZE else None
+    page = page[:BROWSE_PAGE_SIZE]
+    counts = Campaign.counts_for(c.id for c in page)
+    return render_template("player/browse.html", campaigns=page, counts=counts,
+                           q=q, next_after=next_after, paged=after is not None)
@@ -0,0 +1,108 @@
+"""
+Campaign character-card listing: full Character rows against the card-column projection.
+Builds a campaign of NPCs (1,000 by default, each with a filled sheet document and notes) in
+a throwaway database, then times each way of loading the list and measures the memory the
+loaded list holds (tracemalloc peak, including the ORM identity map where there is one).
+  full       - Character rows with the sheet document undeferred (the old row width)
+  orm        - Character rows as queried today (sheet document deferred, notes still loaded)
+  load_only  - Character rows restricted to the card columns with load_only()
+  cards      - Character.cards_for(): card columns into CharacterCard tuples, no ORM objects
+    python -m scripts.bench_character_cards [--npcs 1000] [--runs 20]
+"""
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+TMP = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP}/bench_cards.sqlite3"
+
+from sqlalchemy.orm import load_only
+from app import create_app
+from db import db
+from models import Campaign, Character, CharacterCard, User, new_sheet_doc
+from services import auth_service, srd_service
+
+
+def seed(npcs: int) -> int:
+    dm = User.query.filter_by(role="dm").first()
+    campaign = Campaign(name="Card Bench", dm_id=dm.id)
+    db.session.add(campaign)
+    db.session.flush()
+    doc = new_sheet_doc(
+        skills={s.name: True for s in srd_service.ALL_SKILLS[:6]},
+        saving_throws={"strength": True, "constitution": True},
+        equipment=["Longsword", "Shield", "Chain mail", "Explorer's pack", "Rope (50 ft)"] * 4,
+        features=[f"Feature {i}: multiattack, pack tactics and a paragraph of rules text." for i in range(12)],
+        attacks=[{"name": "Longsword", "bonus": 5, "damage": "1d8+3 slashing"}] * 3,
+    )
+    db.session.execute(db.insert(Character), [
+        {"name": f"Goblin {i}", "campaign_id": campaign.id, "is_npc": True, "level": 1 + i % 10,
+         "char_class": "Warrior", "race": "Goblin", "max_hp": 7, "current_hp": 7, "armor_class": 15,
+         "sheet_doc": doc, "notes": "Ambushes travellers on the north road. " * 20}
+        for i in range(npcs)
+    ])
+    db.session.commit()
+    return campaign.id
+
+
+def loaders(cid: int) -> dict:
+    where = Character.campaign_id == cid
+    card_cols = [getattr(Character, f) for f in CharacterCard._fields]
+    return {
+        "full": lambda: Character.query.options(db.undefer(Character.sheet_doc)).filter(where)
+                                       .order_by(Character.id).all(),
+        "orm": lambda: Character.query.filter(where).order_by(Character.id).all(),
+        "load_only": lambda: Character.query.options(load_only(*card_cols)).filter(where)
+                                            .order_by(Character.id).all(),
+        "cards": lambda: Character.cards_for(where),
+    }
+
+
+def measure(load, runs: int) -> tuple[float, float, float]:
+    """(median ms, p90 ms, peak KiB held by one loaded list)"""
+    times = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        chars = load()
+        [c.to_card_dict() for c in chars]  # what a card list does with each row
+        times.append((time.perf_counter() - start) * 1000)
+    del chars
+    db.session.expunge_all()
+    tracemalloc.start()
+    chars = load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del chars
+    db.session.expunge_all()
+    times.sort()
+    return statistics.median(times), times[min(len(times) - 1, int(len(times) * 0.9))], peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--npcs", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        auth_service.ensure_seeded()
+        cid = seed(args.npcs)
+        results = {}
+        for label, load in loaders(cid).items():
+            load()  # warm up statement caches
+            results[label] = measure(load, args.runs)
+            print(f"{label:10s} n={args.npcs}  median {results[label][0]:7.2f} ms  p90 {results[label][1]:7.2f} ms"
+                  f"  peak {results[label][2]:8.0f} KiB")
+        full, cards = results["full"], results["cards"]
+        print(f"cards vs full rows: {full[0] / cards[0]:.1f}x faster, {full[2] / cards[2]:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
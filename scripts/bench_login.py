@@ -0,0 +1,85 @@
+"""
+Login hot-path benchmark: bcrypt calls and wall time per GET+POST /auth/login.
+  legacy - the old per-request ensure_default_accounts (re-verifies every default account)
+  seeded - seeding done once at startup, guarded by the app_meta marker
+  burst  - concurrent logins through the bounded bcrypt pool: throughput, shed count and
+           verify latency percentiles (size AUTH_VERIFY_WORKERS/QUEUE from these)
+Runs against a throwaway SQLite database.
+    python -m scripts.bench_login
+"""
+from __future__ import annotations
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_login.sqlite3"
+
+import bcrypt
+from app import create_app
+from db import db
+from services import auth_service
+
+N = 10
+BURST = 40
+calls = {"checkpw": 0, "hashpw": 0}
+
+
+def counted(name, fn):
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def legacy_seed_check() -> None:
+    """The pre-marker per-request work, kept here only as the benchmark baseline."""
+    for uname, pw, role, _ in auth_service.DEFAULT_ACCOUNTS:
+        u = auth_service.get_user_ci(uname)
+        if u and not auth_service.verify_password(pw, u.password_hash):
+            u.password_hash = auth_service.hash_password(pw)
+
+
+def run(app, legacy: bool) -> tuple[float, float]:
+    client = app.test_client()
+    for k in calls:
+        calls[k] = 0
+    start = time.perf_counter()
+    for _ in range(N):
+        if legacy:
+            with app.app_context():
+                legacy_seed_check()
+                legacy_seed_check()  # GET and POST both seeded
+        client.get("/auth/login")
+        client.post("/auth/login", data={"username": "playerchris", "password": "1974"})
+        client.get("/auth/logout")
+    elapsed = (time.perf_counter() - start) / N * 1000
+    return elapsed, (calls["checkpw"] + calls["hashpw"]) / N
+
+
+def burst(app) -> None:
+    def login(_):
+        r = app.test_client().post("/auth/login", data={"username": "playerchris", "password": "1974"})
+        return r.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=BURST) as pool:
+        codes = list(pool.map(login, range(BURST)))
+    elapsed = time.perf_counter() - start
+    ok = codes.count(302)
+    print(f"burst   {BURST} concurrent logins in {elapsed:.2f}s  ok={ok} shed={codes.count(503)}  "
+          f"{ok / elapsed:.1f} logins/s")
+    print(f"        pool stats: {auth_service.get_verifier().stats()}")
+
+
+if __name__ == "__main__":
+    bcrypt.checkpw = counted("checkpw", bcrypt.checkpw)
+    bcrypt.hashpw = counted("hashpw", bcrypt.hashpw)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        auth_service.ensure_seeded()
+    for mode, legacy in (("legacy", True), ("seeded", False)):
+        ms, per_login = run(app, legacy)
+        print(f"{mode:7s} {ms:8.1f} ms/login  bcrypt calls/login={per_login:.1f}")
+    burst(app)
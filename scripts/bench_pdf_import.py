@@ -0,0 +1,156 @@
+"""
+Character-sheet PDF import benchmark: the AcroForm fast path against the text route.
+  form - read the form dictionary and map it onto Character columns (sheet_import_service)
+  text - extract every page's text, the input of the AI route (add --ai to time the AI read
+         too, against OLLAMA_URL; without it the AI cost is left out, so text is a lower bound)
+By default it builds a corpus of synthetic fillable sheets using the official 5e field names,
+plus flat copies of the same sheets, and checks the mapped values against what was written.
+Pass --dir to run over a folder of real sheets instead (no accuracy check).
+    python -m scripts.bench_pdf_import [--sheets 40] [--dir PATH] [--ai]
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from services import pdf_service, sheet_import_service, srd_service
+
+ABILITY_FIELDS = ("STR", "DEX", "CON", "INT", "WIS", "CHA")
+FILLER = "Lorem ipsum adventuring notes, spell lists and backstory. " * 4
+
+
+def sample_sheet(rng: random.Random, n: int) -> dict:
+    cls = rng.choice(srd_service.SRD_CLASSES)
+    level = rng.randint(1, 20)
+    skills = rng.sample(srd_service.ALL_SKILLS, 4)
+    return {
+        "CharacterName": f"Sample Hero {n}", "ClassLevel": f"{cls.name} {level}",
+        "Race ": rng.choice(srd_service.SRD_RACES).name, "Background": "Soldier", "Alignment": "Chaotic Good",
+        **{f: str(rng.randint(8, 18)) for f in ABILITY_FIELDS},
+        "AC": str(rng.randint(10, 20)), "Speed": "30 ft.", "HPMax": str(rng.randint(8, 160)),
+        "ProfBonus": f"+{srd_service.proficiency_bonus(level)}",
+        "Features and Traits": "Second Wind\nAction Surge",
+        "skills": [s.name for s in skills],
+    }
+
+
+def write_sheet(path: Path, sheet: dict, fillable: bool, pages: int = 3) -> None:
+    from reportlab.pdfgen import canvas
+    cv = canvas.Canvas(str(path))
+    y = 780
+    for name, value in sheet.items():
+        if name == "skills":
+            continue
+        cv.drawString(40, y, f"{name.strip()}:")
+        if fillable:
+            cv.acroForm.textfield(name=name, value=value, x=160, y=y - 4, width=300, height=14, fontSize=9)
+        else:
+            cv.drawString(160, y, value.replace("\n", ", "))
+        y -= 22
+    for i, skill in enumerate(srd_service.ALL_SKILLS):
+        if fillable:
+            cv.acroForm.checkbox(name=f"Check Box {23 + i}", checked=skill.name in sheet["skills"],
+                                 x=40, y=y - 4, size=10)
+        elif skill.name in sheet["skills"]:
+            cv.drawString(40, y, "*")
+        cv.drawString(60, y, skill.name)
+        y -= 14
+    cv.showPage()
+    for _ in range(pages - 1):
+        text = cv.beginText(40, 780)
+        for _ in range(40):
+            text.textLine(FILLER[:90])
+        cv.drawText(text)
+        cv.showPage()
+    cv.save()
+
+
+def matches(sheet: dict, cols: dict | None) -> bool:
+    if cols is None:
+        return False
+    cls, level = sheet["ClassLevel"].rsplit(" ", 1)
+    return (cols["strength"] == int(sheet["STR"]) and cols["dexterity"] == int(sheet["DEX"])
+            and cols["max_hp"] == int(sheet["HPMax"]) and cols["char_class"] == cls and cols["level"] == int(level)
+            and set(cols["sheet_doc"]["skills"]) == set(sheet["skills"]))
+
+
+def fresh(fn, *args):
+    pdf_service._worker_reader.cache_clear()  # every file parsed from scratch, as in a fresh worker
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def form_path(path: str):
+    return sheet_import_service.from_form_fields(pdf_service.form_fields(path))
+
+
+def text_path(path: str):
+    return "\n\n".join(pdf_service.iter_page_text(path))
+
+
+def ai_path(path: str):
+    from services.ollama_service import parse_character_sheet
+    return parse_character_sheet(os.getenv("OLLAMA_URL", "http://localhost:4242"),
+                                 os.getenv("OLLAMA_MODEL", "mistral"), text_path(path))
+
+
+def summary(label: str, times: list[float]) -> str:
+    times = sorted(times)
+    p90 = times[min(len(times) - 1, int(len(times) * 0.9))]
+    return f"{label:28s} n={len(times):3d}  median {statistics.median(times):8.2f} ms  p90 {p90:8.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sheets", type=int, default=40)
+    parser.add_argument("--dir", type=Path)
+    parser.add_argument("--ai", action="store_true")
+    args = parser.parse_args()
+
+    if args.dir:
+        corpus = [(str(p), None) for p in sorted(args.dir.glob("*.pdf"))]
+    else:
+        rng, out = random.Random(5), Path(tempfile.mkdtemp())
+        corpus = []
+        for n in range(args.sheets):
+            sheet = sample_sheet(rng, n)
+            for fillable in (True, False):
+                path = out / f"sheet_{n}_{'form' if fillable else 'flat'}.pdf"
+                write_sheet(path, sheet, fillable)
+                corpus.append((str(path), sheet))
+        print(f"corpus: {len(corpus)} synthetic sheets in {out}")
+
+    form_times, flat_times, text_times, ai_times, correct = [], [], [], [], 0
+    for path, sheet in corpus:
+        ms, cols = fresh(form_path, path)
+        if cols is not None:
+            form_times.append(ms)
+            correct += sheet is not None and matches(sheet, cols)
+        else:
+            flat_times.append(ms)
+        text_times.append(fresh(text_path, path)[0])
+        if args.ai and cols is None:
+            ai_times.append(fresh(ai_path, path)[0])
+
+    if form_times:
+        print(summary("form fields (fast path)", form_times))
+    if flat_times:
+        print(summary("form check on flat PDFs", flat_times))
+    print(summary("page text (AI route input)", text_times))
+    if ai_times:
+        print(summary("page text + AI read", ai_times))
+    print(f"fillable sheets recognised: {len(form_times)}/{len(corpus)}")
+    if not args.dir:
+        print(f"fillable sheets mapped exactly (STR, DEX, HPMax, class, level, skills): {correct}/{args.sheets}")
+    if form_times:
+        print(f"fast path vs text extraction alone: "
+              f"{statistics.median(text_times) / statistics.median(form_times):.1f}x faster (before any AI time)")
+
+
+if __name__ == "__main__":
+    main()
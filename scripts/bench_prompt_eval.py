@@ -0,0 +1,69 @@
+"""
+Compare Ollama prompt-eval cost for a scripted wizard session:
+  legacy  - the old per-step system prompt (build summary first, SRD summary sent twice for some steps)
+  session - WIZARD_SYSTEM_PROMPT prefix + server-side history + keep_alive
+
+Needs a running Ollama (OLLAMA_URL / OLLAMA_MODEL from .env or the environment).
+    python -m scripts.bench_prompt_eval
+"""
+from __future__ import annotations
+from config import Config
+from services.ollama_service import (
+    SRD_PROMPT_SUMMARY, STEP_INSTRUCTIONS, WizardSessions, _build_summary, get_client, step_prompt,
+)
+
+SCRIPT = [
+    ("race", {"race": "Elf (High)"}, "Tell me about Elf (High) as a race choice for my build."),
+    ("class", {"race": "Elf (High)", "char_class": "Wizard"}, "Tell me about Wizard as a class choice for my build."),
+    ("background", {"race": "Elf (High)", "char_class": "Wizard", "background": "Sage"}, "Does Sage fit?"),
+    ("abilities", {"race": "Elf (High)", "char_class": "Wizard", "background": "Sage"}, "How should I assign my scores?"),
+    ("general", {"race": "Elf (High)", "char_class": "Wizard", "background": "Sage"}, "What cantrips should I pick?"),
+]
+
+
+def legacy_messages(step: str, build: dict, message: str) -> list:
+    """The pre-session prompt layout, kept here only as the benchmark baseline."""
+    body = STEP_INSTRUCTIONS.get(step, STEP_INSTRUCTIONS["general"])
+    if step in ("abilities", "general"):
+        body = SRD_PROMPT_SUMMARY + "\n" + body
+    system = f"You are a D&D 5e expert DM.\nCurrent build: {_build_summary(build)}\n{body}"
+    return [
+        {"role": "system", "content": system + "\n\n" + SRD_PROMPT_SUMMARY},
+        {"role": "user", "content": message},
+    ]
+
+
+def chat(messages: list, keep_alive) -> dict:
+    r = get_client().post(
+        Config.OLLAMA_URL.rstrip("/") + "/api/chat",
+        json={"model": Config.OLLAMA_MODEL, "messages": messages, "stream": False, "keep_alive": keep_alive},
+        timeout=300,
+    )
+    r.raise_for_status()
+    return r.json()
+
+
+def run(mode: str) -> tuple[int, float]:
+    sessions = WizardSessions()
+    tokens = 0
+    ms = 0.0
+    for step, build, message in SCRIPT:
+        if mode == "legacy":
+            body = chat(legacy_messages(step, build, message), keep_alive="5m")  # Ollama default
+        else:
+            messages = step_prompt(step, build, message, sessions.history("bench", 0))
+            body = chat(messages, keep_alive=Config.OLLAMA_KEEP_ALIVE)
+            sessions.record("bench", 0, messages[-1]["content"], body.get("message", {}).get("content", ""))
+        n = body.get("prompt_eval_count", 0)
+        d = body.get("prompt_eval_duration", 0) / 1e6
+        print(f"  {mode:8s} {step:12s} prompt_eval_count={n:6d}  prompt_eval_ms={d:9.1f}")
+        tokens += n
+        ms += d
+    return tokens, ms
+
+
+if __name__ == "__main__":
+    print(f"Ollama {Config.OLLAMA_URL} model={Config.OLLAMA_MODEL}")
+    results = {mode: run(mode) for mode in ("legacy", "session")}
+    for mode, (tokens, ms) in results.items():
+        print(f"{mode:8s} total prompt tokens evaluated={tokens:7d}  prompt eval time={ms:9.1f} ms")
@@ -0,0 +1,56 @@
+"""
+Per-request session overhead for each SESSION_BACKEND (cookie, sqlite, filesystem).
+Logs in once, then times N requests that only read the session (GET /) and N that
+write it (a flash on logout + login). Runs against throwaway databases.
+    python -m scripts.bench_sessions
+"""
+from __future__ import annotations
+import os
+import tempfile
+import time
+
+TMP = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP}/bench_sessions.sqlite3"
+
+from flask import session
+from app import create_app
+from config import Config
+from db import db
+from services import auth_service
+
+N = 2000
+
+
+def bench(backend: str) -> None:
+    Config.SECRET_KEY = "bench-sessions-" + os.urandom(16).hex()
+    Config.SESSION_BACKEND = backend
+    Config.SESSION_FILE_DIR = f"{TMP}/fs_sessions"
+    Config.SESSION_SQLITE_PATH = f"{TMP}/sessions.sqlite3"
+    app = create_app()
+
+    @app.get("/_bench/read")
+    def _read():
+        return str(session.get("user_id"))
+
+    @app.get("/_bench/write")
+    def _write():
+        session["counter"] = session.get("counter", 0) + 1
+        return "ok"
+
+    with app.app_context():
+        db.create_all()
+        auth_service.ensure_seeded()
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "playerchris", "password": "1974"})
+    for path in ("/_bench/read", "/_bench/write"):
+        client.get(path)  # warm up
+        start = time.perf_counter()
+        for _ in range(N):
+            client.get(path)
+        us = (time.perf_counter() - start) / N * 1e6
+        print(f"{backend:10s} {path.rsplit('/', 1)[1]:5s} {us:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    for backend in ("filesystem", "sqlite", "cookie"):
+        bench(backend)
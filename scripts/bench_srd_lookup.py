@@ -0,0 +1,36 @@
+"""
+Micro-benchmark: SRD lookups via the precomputed indexes vs the old linear scans.
+    python -m scripts.bench_srd_lookup
+"""
+from __future__ import annotations
+import timeit
+from services import srd_service as srd
+
+N = 200_000
+
+
+def linear(records, name):
+    return next((r for r in records if r.name == name), None)
+
+
+def features_loop(cls, level):
+    feats = []
+    for lvl in range(1, min(level, 20) + 1):
+        feats.extend(cls.features_by_level.get(lvl, ()))
+    return feats
+
+
+CASES = [
+    ("race (last entry)", lambda: linear(srd.SRD_RACES, "Tiefling"), lambda: srd.get_race("Tiefling")),
+    ("class (last entry)", lambda: linear(srd.SRD_CLASSES, "Wizard"), lambda: srd.get_class("Wizard")),
+    ("background (last entry)", lambda: linear(srd.SRD_BACKGROUNDS, "Urchin"), lambda: srd.get_background("Urchin")),
+    ("features at level 20", lambda: features_loop(srd.get_class("Wizard"), 20),
+     lambda: srd.get_class("Wizard").features_at(20)),
+]
+
+if __name__ == "__main__":
+    print(f"{'lookup':26s} {'scan ns/op':>12s} {'index ns/op':>12s} {'speedup':>8s}")
+    for label, old, new in CASES:
+        t_old = timeit.timeit(old, number=N) / N * 1e9
+        t_new = timeit.timeit(new, number=N) / N * 1e9
+        print(f"{label:26s} {t_old:12.0f} {t_new:12.0f} {t_old / t_new:7.1f}x")
@@ -0,0 +1,81 @@
+"""
+Query-budget check: seeds a throwaway database with a large campaign (40 players,
+200 NPCs) plus 300 other open campaigns, and fails if any route below issues more
+SQL statements than its budget.
+Run before pushing changes that touch routes or relationships:
+    python -m scripts.check_query_budgets
+"""
+from __future__ import annotations
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/budgets.sqlite3"
+
+from app import create_app
+from db import db, count_queries, QueryBudgetExceeded
+from models import User, Campaign, CampaignMembership, Character
+from services import auth_service
+
+PLAYERS = 40
+NPCS = 200
+OPEN_CAMPAIGNS = 300
+
+# (user, path, max statements) - a budget must not grow with campaign size
+BUDGETS = [
+    ("dmchris", "/campaigns/{cid}", 6),
+    ("playerchris", "/campaigns/{cid}", 6),
+    ("playerchris", "/player/campaigns/browse", 4),
+    ("playerchris", "/player/campaigns/browse?q=open&after=150&after_name=Open%20Table%20147", 4),
+    ("dmchris", "/dm/", 3),
+    ("adminchris", "/dm/", 3),  # admins see every campaign
+    ("adminchris", "/admin/", 7),
+    ("adminchris", "/admin/?role=player&uq=budget&cq=open&upage=2&cpage=3", 7),
+    ("adminchris", "/admin/api/users?role=player&page=2", 2),
+    ("adminchris", "/admin/api/campaigns?q=table&page=2", 2),
+]
+
+
+def seed(app) -> int:
+    with app.app_context():
+        db.create_all()
+        auth_service.ensure_seeded()
+        dm = User.query.filter_by(username="dmchris").one()
+        player = User.query.filter_by(username="playerchris").one()
+        camp = Campaign(name="Budget Campaign", dm_id=dm.id)
+        db.session.add(camp)
+        db.session.flush()
+        users = [User(username=f"budget_player_{i}", password_hash="x", role="player") for i in range(PLAYERS)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add(CampaignMembership(campaign_id=camp.id, user_id=player.id, approved=True))
+        for i, u in enumerate(users):
+            db.session.add(CampaignMembership(campaign_id=camp.id, user_id=u.id, approved=i % 4 != 0))
+            db.session.add(Character(name=f"PC {i}", owner_id=u.id, campaign_id=camp.id))
+        db.session.add_all(Character(name=f"NPC {i}", is_npc=True, campaign_id=camp.id) for i in range(NPCS))
+        db.session.add_all(Campaign(name=f"Open Table {i:03d}", dm_id=users[i % PLAYERS].id)
+                           for i in range(OPEN_CAMPAIGNS))
+        db.session.commit()
+        return camp.id
+
+
+def main() -> int:
+    app = create_app()
+    cid = seed(app)
+    failures = 0
+    for user, path, budget in BUDGETS:
+        client = app.test_client()
+        client.post("/auth/login", data={"username": user, "password": "1974"})
+        url = path.format(cid=cid)
+        try:
+            with count_queries(budget=budget) as q:
+                status = client.get(url).status_code
+            print(f"ok    {user:12s} {url:45s} {q.count:3d}/{budget} queries  HTTP {status}")
+        except QueryBudgetExceeded as e:
+            failures += 1
+            print(f"FAIL  {user:12s} {url:45s} {e}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
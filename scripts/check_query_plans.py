@@ -0,0 +1,118 @@
+"""
+EXPLAIN QUERY PLAN check for the hot queries. Builds a throwaway database, strips the
+indexes back to the pre-migration schema, runs services.schema_service.migrate(), seeds
+some rows and then fails (exit 1) if any query below does not use its expected index.
+    python -m scripts.check_query_plans
+"""
+from __future__ import annotations
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/plans.sqlite3"
+
+from sqlalchemy import text
+from app import create_app
+from db import db
+from models import User, Campaign, CampaignMembership, Character, CharacterTemplate
+from services import schema_service
+
+
+def hot_queries():
+    """(description, statement, index the plan must use)"""
+    name_key = db.collate(Campaign.name, "NOCASE")
+    return [
+        ("campaign view: characters",
+         Character.query.filter_by(campaign_id=1).order_by(Character.id).statement,
+         "ix_characters_campaign_npc"),
+        ("campaign counts: PCs/NPCs",
+         db.select(Character.campaign_id, db.func.count()).where(Character.campaign_id.in_([1, 2, 3]),
+                                                                  Character.is_npc.is_(True))
+         .group_by(Character.campaign_id),
+         "ix_characters_campaign_npc"),
+        ("player: own characters",
+         Character.query.filter_by(owner_id=1, campaign_id=2).statement,
+         "ix_characters_owner_campaign"),
+        ("campaign view: memberships",
+         CampaignMembership.query.filter_by(campaign_id=1).statement,
+         "sqlite_autoindex_campaign_memberships_1"),
+        ("player dashboard: approved memberships",
+         CampaignMembership.query.filter_by(user_id=1, approved=True).statement,
+         "ix_memberships_user_approved"),
+        ("browse: active campaigns by name",
+         Campaign.query.filter(Campaign.is_active.is_(True), name_key >= "op", name_key < "op\U0010ffff")
+         .order_by(name_key, Campaign.id).limit(25).statement,
+         "ix_campaigns_active_name"),
+        ("browse: next page after a cursor",
+         Campaign.query.filter(Campaign.is_active.is_(True),
+                               db.tuple_(name_key, Campaign.id) > db.tuple_("Open Table 147", 150))
+         .order_by(name_key, Campaign.id).limit(25).statement,
+         "ix_campaigns_active_name"),
+        ("dm dashboard: own campaigns",
+         Campaign.query.filter_by(dm_id=1).order_by(Campaign.created_at.desc()).statement,
+         "ix_campaigns_dm_created"),
+        ("admin: newest campaigns",
+         Campaign.query.order_by(Campaign.created_at.desc(), Campaign.id.desc()).limit(25).statement,
+         "ix_campaigns_created"),
+        ("template library",
+         CharacterTemplate.query.filter_by(owner_id=1, is_npc_template=False)
+         .order_by(CharacterTemplate.times_used.desc()).statement,
+         "ix_templates_owner_kind_used"),
+        ("admin: role filter / last-admin count",
+         User.query.filter_by(role="admin").statement,
+         "ix_users_role_username"),
+    ]
+
+
+def strip_to_legacy_schema() -> None:
+    """Drop every index migration 1 adds, as on a database created before it existed."""
+    with db.engine.begin() as conn:
+        for table in db.metadata.tables.values():
+            for index in table.indexes:
+                if index.name.startswith(("ix_users_role", "ix_campaigns_", "ix_memberships_",
+                                          "ix_templates_", "ix_characters_")):
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        conn.execute(text("DELETE FROM app_meta WHERE key = :k"), {"k": schema_service.VERSION_KEY})
+
+
+def seed() -> None:
+    users = [User(username=f"plan_user_{i}", password_hash="x", role=("player", "dm", "admin")[i % 3])
+             for i in range(60)]
+    db.session.add_all(users)
+    db.session.flush()
+    camps = [Campaign(name=f"Open Table {i}", dm_id=users[i % 60].id, is_active=i % 5 != 0) for i in range(200)]
+    db.session.add_all(camps)
+    db.session.flush()
+    for i, u in enumerate(users):
+        db.session.add(CampaignMembership(campaign_id=camps[i].id, user_id=u.id, approved=i % 2 == 0))
+        db.session.add(CharacterTemplate(owner_id=u.id, name=f"T{i}", is_npc_template=i % 2 == 0, times_used=i))
+    db.session.add_all(Character(name=f"C{i}", owner_id=users[i % 60].id, campaign_id=camps[i % 200].id,
+                                 is_npc=i % 3 == 0) for i in range(2000))
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def main() -> int:
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        schema_service.migrate()  # stamp the fresh schema first
+        strip_to_legacy_schema()
+        applied = schema_service.migrate()
+        print(f"migrated legacy schema: applied {applied}, now at {schema_service.current_version()}")
+        seed()
+        failures = 0
+        for description, stmt, index in hot_queries():
+            sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in db.session.execute(text("EXPLAIN QUERY PLAN " + sql))]
+            if any(index in step for step in plan):
+                print(f"ok    {description:40s} {index}")
+            else:
+                failures += 1
+                print(f"FAIL  {description:40s} expected {index}; plan: {' | '.join(plan)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
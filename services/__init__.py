@@ -1 +1 @@
-from . import srd_service, ollama_service, auth_service
+from . import srd_service, ollama_service, auth_service, cache_service, job_service, session_service, schema_service, ingest_service, sheet_pdf_service
@@ -1,11 +1,249 @@
 from __future__ import annotations
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import bcrypt
+from sqlalchemy import func
+from db import db
+from models import User, AppMeta
 
-def hash_password(plain: str) -> str:
-    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+# --- CHARACTERFORGE DEFAULT ACCOUNTS ---
+# admin:        adminchris / 1974
+# dungeon master: dmchris / 1974
+# player:       playerchris / 1974
+# Usernames are case-insensitive; passwords are case-sensitive.
 
-def verify_password(plain: str, hashed: str) -> bool:
+DEFAULT_ACCOUNTS = [
+    ("adminchris",  "1974", "admin",  "AdminChris"),
+    ("dmchris",     "1974", "dm",     "DMChris"),
+    ("playerchris", "1974", "player", "PlayerChris"),
+]
+# Bump when DEFAULT_ACCOUNTS changes so existing installs re-seed once
+DEFAULT_ACCOUNTS_VERSION = "1"
+SEED_MARKER = "default_accounts_seeded"
+
+_seed_lock = threading.Lock()
+_seeded = False
+_rounds = 12
+_verifier: "PasswordVerifier | None" = None
+
+
+class VerifierBusy(RuntimeError):
+    """Raised when the verify queue is full or a verification timed out; the login should be retried."""
+
+
+class PasswordVerifier:
+    """
+    Runs bcrypt on a small dedicated pool (bcrypt releases the GIL while hashing), so request
+    threads only wait on a future. At most `workers` hashes run at once and `queue` more may
+    wait; beyond that verify() sheds the request with VerifierBusy instead of piling up.
+    Keeps a window of recent wait/hash timings for capacity planning.
+    """
+
+    def __init__(self, workers: int = 2, queue: int = 32, timeout: float = 10.0, window: int = 2048):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, queue))
+        self._capacity = self.workers + max(0, queue)
+        self._lock = threading.Lock()
+        self._wait_ms: deque[float] = deque(maxlen=window)
+        self._hash_ms: deque[float] = deque(maxlen=window)
+        self._in_flight = 0
+        self.counters = {"verified": 0, "rejected": 0, "shed": 0, "timeouts": 0, "rehashed": 0}
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def _check(self, plain: str, hashed: str, queued_at: float) -> bool:
+        started = time.perf_counter()
+        try:
+            return _checkpw(plain, hashed)
+        finally:
+            done = time.perf_counter()
+            with self._lock:
+                self._wait_ms.append((started - queued_at) * 1000)
+                self._hash_ms.append((done - started) * 1000)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        """Run `fn` on the pool and wait at most `timeout`; VerifierBusy when full or too slow."""
+        if not self._slots.acquire(blocking=False):
+            self.count("shed")
+            raise VerifierBusy("Too many logins in progress; try again in a moment.")
+        with self._lock:
+            self._in_flight += 1
+        future = self._pool.submit(fn, *args)
+        # The slot is held until the hash actually finishes, even if this caller gives up
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.count("timeouts")
+            raise VerifierBusy("Login timed out waiting for the password check; try again.")
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        ok = self._run(self._check, plain, hashed, time.perf_counter())
+        self.count("verified" if ok else "rejected")
+        return ok
+
+    def hash(self, plain: str) -> str:
+        """Hash on the pool, for rehash-on-login, under the same cap and wait as verify()."""
+        return self._run(_hashpw, plain, _rounds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            wait = sorted(self._wait_ms)
+            hashed = sorted(self._hash_ms)
+            return {
+                "workers": self.workers,
+                "capacity": self._capacity,
+                "in_flight": self._in_flight,
+                "rounds": _rounds,
+                **self.counters,
+                "wait_ms": _percentiles(wait),
+                "hash_ms": _percentiles(hashed),
+            }
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"n": 0}
+    def pct(p):
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 2)
+    return {"n": len(values), "p50": pct(50), "p90": pct(90), "p99": pct(99), "max": round(values[-1], 2)}
+
+
+def _checkpw(plain: str, hashed: str) -> bool:
     try:
         return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
     except Exception:
         return False
+
+def _hashpw(plain: str, rounds: int) -> str:
+    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+def hash_password(plain: str) -> str:
+    """Hash directly, bypassing the login pool: setup, admin and seeding must not be load-shed."""
+    return _hashpw(plain, _rounds)
+
+def verify_password(plain: str, hashed: str) -> bool:
+    """Check a password on the bounded pool. Raises VerifierBusy when the pool sheds the request."""
+    if _verifier is not None:
+        return _verifier.verify(plain, hashed)
+    return _checkpw(plain, hashed)
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with a different work factor than BCRYPT_ROUNDS ($2b$<rounds>$...)."""
+    try:
+        return int(hashed.split("$")[2]) != _rounds
+    except (IndexError, ValueError, AttributeError):
+        return True
+
+def rehash_if_needed(user: User, plain: str) -> bool:
+    """After a successful login, upgrade a hash made with an old work factor. Caller commits."""
+    if not needs_rehash(user.password_hash):
+        return False
+    if _verifier is None:
+        user.password_hash = hash_password(plain)
+        return True
+    try:
+        user.password_hash = _verifier.hash(plain)
+    except VerifierBusy:
+        return False  # the password was right; upgrade on a quieter login instead
+    _verifier.count("rehashed")
+    return True
+
+def get_verifier() -> PasswordVerifier | None:
+    return _verifier
+
+def norm_username(s: str) -> str:
+    return (s or "").strip().casefold()
+
+def get_user_ci(username: str):
+    u = norm_username(username)
+    if not u:
+        return None
+    exact = User.query.filter_by(username=u).first()
+    if exact:
+        return exact
+    return User.query.filter(func.lower(User.username) == u.lower()).order_by(User.id.asc()).first()
+
+def seed_default_accounts() -> None:
+    """Create/repair the default accounts and record the seed marker. Costs up to one bcrypt per account."""
+    for uname, pw, role, display in DEFAULT_ACCOUNTS:
+        u = get_user_ci(uname)
+        if not u:
+            db.session.add(User(username=uname, password_hash=hash_password(pw), role=role, display_name=display))
+            continue
+
+        # enforce canonical username if safe
+        if u.username != uname and User.query.filter_by(username=uname).count() == 0:
+            u.username = uname
+        # enforce role
+        if u.role != role:
+            u.role = role
+        # enforce password
+        if not _checkpw(pw, u.password_hash):
+            u.password_hash = hash_password(pw)
+        if not (u.display_name or "").strip():
+            u.display_name = display
+
+    marker = db.session.get(AppMeta, SEED_MARKER) or AppMeta(key=SEED_MARKER)
+    marker.value = DEFAULT_ACCOUNTS_VERSION
+    db.session.add(marker)
+    db.session.commit()
+
+def ensure_seeded() -> bool:
+    """
+    Seed the default accounts once per database. After the first call in a process this is a
+    flag check; otherwise one marker lookup. Returns False if the schema does not exist yet.
+    """
+    global _seeded
+    if _seeded:
+        return True
+    with _seed_lock:
+        if _seeded:
+            return True
+        inspector = db.inspect(db.engine)
+        if not inspector.has_table("users"):
+            return False
+        if not inspector.has_table(AppMeta.__tablename__):
+            AppMeta.__table__.create(db.engine, checkfirst=True)
+        marker = db.session.get(AppMeta, SEED_MARKER)
+        if marker is None or marker.value != DEFAULT_ACCOUNTS_VERSION:
+            seed_default_accounts()
+        _seeded = True
+    return True
+
+def init_app(app) -> None:
+    """
+    Start the bcrypt pool, run the one-time seeding and register `flask seed-accounts`.
+    Called from create_app().
+    """
+    global _rounds, _verifier
+    cfg = app.config
+    _rounds = max(4, min(31, cfg.get("BCRYPT_ROUNDS", 12)))
+    if _verifier is None:
+        _verifier = PasswordVerifier(
+            workers=cfg.get("AUTH_VERIFY_WORKERS", 2),
+            queue=cfg.get("AUTH_VERIFY_QUEUE", 32),
+            timeout=cfg.get("AUTH_VERIFY_TIMEOUT", 10.0),
+        )
+    app.extensions["password_verifier"] = _verifier
+    with app.app_context():
+        # Fresh install: db.create_all() has not run yet; the first login request seeds instead
+        ensure_seeded()
+
+    @app.cli.command("seed-accounts")
+    def seed_accounts_command():
+        """Re-create or repair the default accounts (resets their passwords)."""
+        db.create_all()
+        seed_default_accounts()
+        print(f"Seeded {len(DEFAULT_ACCOUNTS)} default accounts.")
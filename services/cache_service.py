@@ -0,0 +1,131 @@
+"""
+Content-addressed cache for AI replies.
+Keyed on a hash of the model name + full messages list, so the same wizard
+question for the same build is only ever generated once.
+Two tiers: an in-memory LRU, and an optional SQLite file under data/.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def reply_key(model: str, messages: list) -> str:
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplyCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 86400.0,
+                 db_path: str | None = None, disk_max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._mem: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._puts_since_trim = 0
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ai_replies ("
+                " key TEXT PRIMARY KEY, reply TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_ai_replies_accessed ON ai_replies (accessed_at)")
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                created, reply = hit
+                if now - created <= self.ttl:
+                    self._mem.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return reply
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT reply, created_at FROM ai_replies WHERE key = ? AND created_at >= ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row:
+                    self._db.execute("UPDATE ai_replies SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[1], row[0])
+                    self._counters["disk_hits"] += 1
+                    return row[0]
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, reply: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, reply)
+            self._counters["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO ai_replies (key, reply, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, reply, now, now),
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= 50:
+                    self._trim_disk(now)
+
+    def _remember(self, key: str, created: float, reply: str) -> None:
+        self._mem[key] = (created, reply)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _trim_disk(self, now: float) -> None:
+        """Drop expired rows, then the least recently used beyond disk_max_entries."""
+        self._puts_since_trim = 0
+        self._db.execute("DELETE FROM ai_replies WHERE created_at < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM ai_replies WHERE key IN ("
+            " SELECT key FROM ai_replies ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+            out["memory_entries"] = len(self._mem)
+            if self._db is not None:
+                out["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM ai_replies").fetchone()[0]
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = round((out["memory_hits"] + out["disk_hits"]) / lookups, 3) if lookups else None
+        return out
+
+
+_cache: ReplyCache | None = None
+
+def init_app(app) -> ReplyCache:
+    """Build the reply cache from Config. Called once from create_app()."""
+    global _cache
+    cfg = app.config
+    _cache = ReplyCache(
+        max_entries=cfg.get("AI_CACHE_SIZE", 512),
+        ttl=cfg.get("AI_CACHE_TTL", 86400.0),
+        db_path=cfg.get("AI_CACHE_DB") or None,
+        disk_max_entries=cfg.get("AI_CACHE_DISK_MAX", 5000),
+    )
+    app.extensions["ai_cache"] = _cache
+    return _cache
+
+def get_cache() -> ReplyCache:
+    global _cache
+    if _cache is None:
+        _cache = ReplyCache()
+    return _cache
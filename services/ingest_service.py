@@ -0,0 +1,334 @@
+"""
+Background PDF ingestion.
+Submitting streams the upload to disk and returns an ingestion id immediately. Files are stored
+content-addressed by SHA-256 (UPLOAD_FOLDER/pdf/ab/abcd....pdf) and shared by every upload of the
+same bytes; pdf_blobs.refcount counts the ingestions using a file, which is deleted at zero.
+
+Extraction results (page text and AcroForm values) are cached per hash, so a repeat upload of an
+already extracted PDF finishes at once. Otherwise a coordinator thread fans the pages out to a
+process pool (pypdf is pure Python, so threads would serialise on the GIL) and writes each page's
+text to pdf_pages as it finishes, updating progress counters as it goes. Each page has its own
+time limit; a slow or broken page is recorded and skipped rather than failing the whole document,
+and pages that timed out are retried the next time the same file is uploaded.
+"""
+from __future__ import annotations
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from db import db
+from models import PdfBlob, PdfIngestion, PdfPage
+from services.pdf_service import save_upload, hash_file, looks_like_pdf, describe, extract_page, worker_context
+
+ACTIVE_STATUSES = ("queued", "running")
+CLAIMABLE_BLOB_STATUSES = ("new", "partial")
+
+
+class PdfIngestQueue:
+    def __init__(self, app, processes: int = 2, page_timeout: float = 20.0, coordinators: int = 2,
+                 per_user_limit: int = 3, keep_finished: float = 7 * 86400.0, wait_poll: float = 0.5,
+                 stale_after: float | None = None):
+        self.app = app
+        self.processes = max(1, processes)
+        self.page_timeout = page_timeout
+        # Extraction or ingestion with no heartbeat for this long is presumed dead (its process
+        # exited or hung) and may be taken over; several page timeouts, as the pool is shared
+        self.stale_after = stale_after if stale_after is not None else max(120.0, page_timeout * 6)
+        self.per_user_limit = per_user_limit
+        self.keep_finished = keep_finished
+        self.wait_poll = wait_poll
+        self.store_dir = Path(app.config["UPLOAD_FOLDER"]) / "pdf"
+        self.chunk_size = app.config.get("PDF_UPLOAD_CHUNK", 1024 * 1024)
+        self._coordinators = ThreadPoolExecutor(max_workers=coordinators, thread_name_prefix="pdf-ingest")
+        self._procs: ProcessPoolExecutor | None = None
+        self._procs_lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Started on first use so creating the app never forks worker processes
+        with self._procs_lock:
+            if self._procs is None:
+                self._procs = ProcessPoolExecutor(max_workers=self.processes, mp_context=worker_context())
+            return self._procs
+
+    def _reset_pool(self) -> None:
+        with self._procs_lock:
+            if self._procs is not None:
+                self._procs.shutdown(wait=False, cancel_futures=True)
+            self._procs = None
+
+    def _stale(self, model):
+        """Filter for rows of `model` whose heartbeat is missing or older than stale_after."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        return db.or_(model.heartbeat_at.is_(None), model.heartbeat_at < cutoff)
+
+    # --- content-addressed store ---------------------------------------------------------
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.store_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def _acquire(self, sha256: str, size: int) -> None:
+        """Take one reference on the blob for `sha256`, creating its row. Part of the caller's transaction."""
+        table = PdfBlob.__table__
+        db.session.execute(sqlite_insert(table).values(
+            sha256=sha256, stored_path=str(self.blob_path(sha256)), size_bytes=size).on_conflict_do_nothing())
+        db.session.execute(table.update().where(table.c.sha256 == sha256).values(refcount=table.c.refcount + 1))
+
+    def _place(self, src: Path, sha256: str) -> Path:
+        # Always move the new copy into place (same bytes): only done after the reference is
+        # committed, so a concurrent _release of the last reference cannot unlink it afterwards
+        dest = self.blob_path(sha256)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, dest)
+        return dest
+
+    def _release(self, sha256: str) -> None:
+        """Drop one reference; at zero delete the cached pages, the row and the file. Caller commits."""
+        table = PdfBlob.__table__
+        db.session.execute(table.update().where(table.c.sha256 == sha256).values(refcount=table.c.refcount - 1))
+        left = db.session.execute(db.select(table.c.refcount).where(table.c.sha256 == sha256)).scalar()
+        if left is not None and left <= 0:
+            db.session.execute(PdfPage.__table__.delete().where(PdfPage.sha256 == sha256))
+            db.session.execute(table.delete().where(table.c.sha256 == sha256))
+            # Unlinked while this transaction holds SQLite's write lock; a concurrent _acquire waits for it
+            self.blob_path(sha256).unlink(missing_ok=True)
+
+    # --- public API ------------------------------------------------------------------------
+
+    def submit(self, user_id: int, upload) -> PdfIngestion | str:
+        """Save the upload and queue it (or serve it from cache). Returns the ingestion, or an error string."""
+        active = PdfIngestion.query.filter(PdfIngestion.user_id == user_id,
+                                           PdfIngestion.status.in_(ACTIVE_STATUSES)).count()
+        if active >= self.per_user_limit:
+            return f"You already have {active} PDF(s) being processed. Wait for one to finish."
+        ingestion_id = uuid.uuid4().hex
+        tmp = self.store_dir / "incoming" / f"{ingestion_id}.pdf"
+        size, sha256 = save_upload(upload.stream, tmp, self.chunk_size)
+        if not size or not looks_like_pdf(tmp):
+            tmp.unlink(missing_ok=True)
+            return "That file is not a PDF."
+
+        self._acquire(sha256, size)
+        ingestion = PdfIngestion(id=ingestion_id, user_id=user_id, sha256=sha256,
+                                 filename=(upload.filename or "upload.pdf")[:255],
+                                 stored_path=str(self.blob_path(sha256)), size_bytes=size, status="queued")
+        blob = db.session.get(PdfBlob, sha256)
+        if blob.status == "ready":
+            self._finish_from_cache(ingestion, blob)
+        db.session.add(ingestion)
+        db.session.commit()
+        self._place(tmp, sha256)
+        if ingestion.status == "queued":
+            self._coordinators.submit(self._run, ingestion_id)
+        return ingestion
+
+    def delete(self, ingestion: PdfIngestion) -> str | None:
+        """Remove an upload and release its file. Returns an error string if it is still being processed."""
+        if ingestion.status in ACTIVE_STATUSES:
+            return "This PDF is still being processed."
+        sha256 = ingestion.sha256
+        db.session.delete(ingestion)
+        if sha256:
+            self._release(sha256)
+        db.session.commit()
+        return None
+
+    def resume(self) -> int:
+        """Restart ingestions interrupted by a restart and prune old finished ones."""
+        now = datetime.utcnow()
+        # Only work whose heartbeat went stale: other live processes may own anything fresher
+        PdfBlob.query.filter(PdfBlob.status == "extracting", self._stale(PdfBlob)).update(
+            {"status": "new"}, synchronize_session=False)
+        PdfIngestion.query.filter(PdfIngestion.status == "running", self._stale(PdfIngestion)).update(
+            {"status": "queued", "started_at": None, "pages_done": 0, "pages_failed": 0}, synchronize_session=False)
+        for ing in PdfIngestion.query.filter(
+                PdfIngestion.status.in_(("done", "failed")),
+                PdfIngestion.finished_at < now - timedelta(seconds=self.keep_finished)).all():
+            sha256 = ing.sha256
+            db.session.delete(ing)
+            if sha256:
+                self._release(sha256)
+        db.session.commit()
+        ids = [i.id for i in PdfIngestion.query.filter_by(status="queued").order_by(PdfIngestion.created_at).all()]
+        for ingestion_id in ids:
+            self._coordinators.submit(self._run, ingestion_id)
+        return len(ids)
+
+    # --- worker side -----------------------------------------------------------------------
+
+    def _run(self, ingestion_id: str) -> None:
+        with self.app.app_context():
+            now = datetime.utcnow()
+            claimed = PdfIngestion.query.filter_by(id=ingestion_id, status="queued").update(
+                {"status": "running", "started_at": now, "heartbeat_at": now}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                return
+            ing = db.session.get(PdfIngestion, ingestion_id)
+            try:
+                error = self._ingest(ing)
+            except Exception as e:
+                db.session.rollback()
+                error = f"PDF ingestion crashed: {e}"
+            if ing.status not in ("done", "failed"):
+                ing.status = "failed" if error else "done"
+                ing.error = error
+                ing.finished_at = datetime.utcnow()
+            db.session.commit()
+
+    def _adopt_legacy_file(self, ing: PdfIngestion) -> None:
+        """Uploads stored before content addressing: hash the file and move it into the store."""
+        path = Path(ing.stored_path)
+        sha256 = hash_file(path)
+        self._acquire(sha256, path.stat().st_size)
+        ing.sha256, ing.stored_path = sha256, str(self.blob_path(sha256))
+        db.session.commit()
+        self._place(path, sha256)
+
+    def _ingest(self, ing: PdfIngestion) -> str | None:
+        if ing.sha256 is None:
+            if not Path(ing.stored_path).exists():
+                return "The uploaded file is missing."
+            self._adopt_legacy_file(ing)
+        while True:
+            # Exactly one ingestion extracts a given file; others with the same hash wait for its
+            # pages, and take the extraction over if its heartbeat goes stale (owner died or hung)
+            claimable = db.or_(PdfBlob.status.in_(CLAIMABLE_BLOB_STATUSES),
+                               db.and_(PdfBlob.status == "extracting", self._stale(PdfBlob)))
+            claimed = PdfBlob.query.filter(PdfBlob.sha256 == ing.sha256, claimable).update(
+                {"status": "extracting", "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            blob = db.session.get(PdfBlob, ing.sha256)
+            db.session.refresh(blob)
+            if claimed:
+                try:
+                    return self._extract(ing, blob)
+                except BaseException:
+                    db.session.rollback()
+                    blob.status = "new"
+                    db.session.commit()
+                    raise
+            if blob.status == "ready":
+                self._finish_from_cache(ing, blob)
+                return ing.error
+            ing.pages_total = blob.pages_total
+            ing.pages_done = blob.pages.count()
+            ing.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+            time.sleep(self.wait_poll)
+
+    def _finish_from_cache(self, ing: PdfIngestion, blob: PdfBlob) -> None:
+        now = datetime.utcnow()
+        ing.cached = True
+        ing.pages_total = ing.pages_done = blob.pages_total or 0
+        ing.pages_failed = blob.pages_failed
+        ing.started_at = ing.started_at or now
+        ing.finished_at = now
+        if blob.pages_total and blob.pages_failed == blob.pages_total:
+            ing.status, ing.error = "failed", "No text could be extracted from any page."
+        else:
+            ing.status = "done"
+
+    def _extract(self, ing: PdfIngestion, blob: PdfBlob) -> str | None:
+        try:
+            # Parsed in a worker process, so the web process never holds the document
+            total, fields = self._pool().submit(describe, blob.stored_path, self.page_timeout).result()
+        except BrokenProcessPool:
+            self._reset_pool()
+            blob.status = "new"
+            db.session.commit()
+            return "A PDF worker process crashed while reading this file."
+        except Exception:
+            blob.status = "new"
+            db.session.commit()
+            return "Could not read this PDF (damaged or encrypted)."
+        blob.pages_total = ing.pages_total = total
+        blob.fields_json = json.dumps(fields)
+        # Pages kept from an earlier partial run stay cached; only missing and timed-out pages are redone
+        PdfPage.query.filter_by(sha256=blob.sha256, status="timeout").delete(synchronize_session=False)
+        kept = dict(db.session.execute(db.select(PdfPage.page_no, PdfPage.status)
+                                       .where(PdfPage.sha256 == blob.sha256)).all())
+        ing.pages_done = len(kept)
+        ing.pages_failed = sum(1 for s in kept.values() if s != "ok")
+        blob.heartbeat_at = ing.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+        todo = [n for n in range(total) if n not in kept]
+        futures = {self._pool().submit(extract_page, blob.stored_path, n, self.page_timeout): n for n in todo}
+        # Backstop for platforms without SIGALRM: every page gets its limit, spread over the pool
+        deadline = self.page_timeout * math.ceil(len(todo) / self.processes) + 10
+        pending = set(todo)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                page_no, status, text, elapsed_ms = future.result()
+                self._store(ing, blob, page_no, status, text, elapsed_ms)
+                pending.discard(page_no)
+        except FutureTimeout:
+            for future in futures:
+                future.cancel()
+            for page_no in sorted(pending):
+                self._store(ing, blob, page_no, "timeout", "", int(self.page_timeout * 1000))
+        except BrokenProcessPool:
+            self._reset_pool()
+            blob.status = "new"
+            db.session.commit()
+            return "A PDF worker process crashed while reading this file."
+
+        statuses = [s for (s,) in db.session.execute(db.select(PdfPage.status).where(PdfPage.sha256 == blob.sha256))]
+        blob.pages_failed = sum(1 for s in statuses if s != "ok")
+        blob.status = "partial" if "timeout" in statuses else "ready"
+        blob.extracted_at = datetime.utcnow()
+        db.session.commit()
+        if total and ing.pages_failed == total:
+            return "No text could be extracted from any page."
+        return None
+
+    def _store(self, ing: PdfIngestion, blob: PdfBlob, page_no: int, status: str, text: str, elapsed_ms: int) -> None:
+        """Write one page and bump progress in the same small commit, so pollers see it at once."""
+        # A stalled extractor that was taken over may still finish the same page; first write wins
+        inserted = db.session.execute(sqlite_insert(PdfPage.__table__).values(
+            sha256=blob.sha256, page_no=page_no, status=status, text=text or None,
+            elapsed_ms=elapsed_ms).on_conflict_do_nothing()).rowcount
+        if inserted:
+            ing.pages_done += 1
+            if status != "ok":
+                ing.pages_failed += 1
+        blob.heartbeat_at = ing.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+    def shutdown(self) -> None:
+        self._coordinators.shutdown(wait=False, cancel_futures=True)
+        self._reset_pool()
+
+
+_queue: PdfIngestQueue | None = None
+
+def init_app(app) -> PdfIngestQueue:
+    """Set up the ingest pipeline and resume unfinished work. Called once from create_app()."""
+    global _queue
+    cfg = app.config
+    _queue = PdfIngestQueue(
+        app,
+        processes=cfg.get("PDF_WORKERS", 2),
+        page_timeout=cfg.get("PDF_PAGE_TIMEOUT", 20.0),
+        per_user_limit=cfg.get("PDF_INGESTS_PER_USER", 3),
+    )
+    with app.app_context():
+        # Fresh install: db.create_all() has not run yet, nothing to resume
+        if db.inspect(db.engine).has_table("users"):
+            for model in (PdfBlob, PdfIngestion, PdfPage):
+                model.__table__.create(db.engine, checkfirst=True)
+            _queue.resume()
+    app.extensions["pdf_ingest"] = _queue
+    return _queue
+
+def get_queue() -> PdfIngestQueue:
+    if _queue is None:
+        raise RuntimeError("PDF ingest queue not initialised; call ingest_service.init_app(app)")
+    return _queue
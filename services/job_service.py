@@ -0,0 +1,159 @@
+"""
+Background AI jobs: NPC generation (single/batch) and AI reads of flat character-sheet PDFs (sheet).
+Submitting returns a job id immediately; a bounded thread pool runs the LLM call
+and JSON parsing. Jobs live in the npc_jobs table so queued/running work is
+picked up again after a restart.
+"""
+from __future__ import annotations
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from db import db
+from models import NpcJob, Character, PdfIngestion
+from services import sheet_import_service
+from services.ollama_service import generate_npc, generate_npc_batch, parse_character_sheet
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class NpcJobQueue:
+    def __init__(self, app, max_workers: int = 2, per_user_limit: int = 2, keep_finished: float = 86400.0,
+                 job_timeout: float = 900.0):
+        self.app = app
+        self.per_user_limit = per_user_limit
+        self.keep_finished = keep_finished
+        self.job_timeout = job_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="npc-job")
+
+    def submit(self, user_id: int, description: str, kind: str = "single", params: dict | None = None) -> NpcJob | str:
+        """Queue a job for this user. Returns the job, or an error string if they are at their limit."""
+        values = {"id": uuid.uuid4().hex, "user_id": user_id, "kind": kind, "description": description,
+                  "params_json": json.dumps(params or {}), "status": "queued", "attempts": 0,
+                  "created_at": datetime.utcnow()}
+        active = (db.select(db.func.count()).select_from(NpcJob)
+                  .where(NpcJob.user_id == user_id, NpcJob.status.in_(ACTIVE_STATUSES)).scalar_subquery())
+        # Limit check and insert in one statement: SQLite holds the write lock for the whole
+        # INSERT ... SELECT, so two concurrent submits cannot both see a free slot
+        columns = NpcJob.__table__.c
+        row = db.select(*(db.literal(v, columns[k].type) for k, v in values.items())).where(active < self.per_user_limit)
+        inserted = db.session.execute(db.insert(NpcJob).from_select(list(values), row)).rowcount
+        db.session.commit()
+        if not inserted:
+            return f"You already have {self.per_user_limit} AI job(s) in progress. Wait for one to finish."
+        job = db.session.get(NpcJob, values["id"])
+        self._pool.submit(self._run, job.id)
+        return job
+
+    def resume(self) -> int:
+        """Requeue work left behind by a previous process and prune old finished jobs."""
+        now = datetime.utcnow()
+        # A job running for longer than job_timeout lost its worker (another live process may
+        # still own anything younger, so leave those alone)
+        NpcJob.query.filter(
+            NpcJob.status == "running",
+            NpcJob.started_at < now - timedelta(seconds=self.job_timeout),
+        ).update({"status": "queued", "started_at": None}, synchronize_session=False)
+        NpcJob.query.filter(
+            NpcJob.status.in_(("done", "failed")),
+            NpcJob.finished_at < now - timedelta(seconds=self.keep_finished),
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        ids = [j.id for j in NpcJob.query.filter_by(status="queued").order_by(NpcJob.created_at).all()]
+        for job_id in ids:
+            self._pool.submit(self._run, job_id)
+        return len(ids)
+
+    def _run(self, job_id: str) -> None:
+        with self.app.app_context():
+            # Claim atomically so two processes never run the same job
+            claimed = NpcJob.query.filter_by(id=job_id, status="queued").update(
+                {"status": "running", "started_at": datetime.utcnow(), "attempts": NpcJob.attempts + 1},
+                synchronize_session=False,
+            )
+            db.session.commit()
+            if not claimed:
+                return
+            job = db.session.get(NpcJob, job_id)
+            try:
+                runner = {"batch": self._run_batch, "sheet": self._run_sheet}.get(job.kind, self._run_single)
+                result = runner(job)
+            except Exception as e:
+                db.session.rollback()
+                result = f"AI job crashed: {e}"
+            if isinstance(result, str):
+                job.status = "failed"
+                job.error = result
+            else:
+                job.status = "done"
+                job.result_json = json.dumps(result)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+    def _run_single(self, job: NpcJob) -> dict | str:
+        cfg = self.app.config
+        return generate_npc(cfg["OLLAMA_URL"], cfg["OLLAMA_MODEL"], job.description)
+
+    def _run_batch(self, job: NpcJob) -> dict | str:
+        """Generate the whole group, then insert every Character row (campaign batches) in one commit."""
+        cfg = self.app.config
+        params = json.loads(job.params_json or "{}")
+        npcs = generate_npc_batch(
+            cfg["OLLAMA_URL"], cfg["OLLAMA_MODEL"], job.description,
+            count=params.get("count", 1), variations=params.get("variations"),
+            chunk_size=cfg.get("NPC_BATCH_CHUNK", 6), parallel=cfg.get("NPC_BATCH_PARALLEL", 3),
+        )
+        if isinstance(npcs, str):
+            return npcs
+        if params.get("campaign_id") is None:
+            # Rows with no campaign and no owner would be unreachable; hand back the stat blocks only
+            return {"npcs": npcs, "character_ids": []}
+        chars = [Character.from_npc_dict(npc, params["campaign_id"]) for npc in npcs]
+        db.session.add_all(chars)
+        db.session.flush()
+        return {"npcs": npcs, "character_ids": [c.id for c in chars]}
+
+    def _run_sheet(self, job: NpcJob) -> dict | str:
+        """AI read of a flat PDF's extracted text, saved as a character owned by the submitter."""
+        cfg = self.app.config
+        params = json.loads(job.params_json or "{}")
+        ing = db.session.get(PdfIngestion, params.get("ingestion_id"))
+        if not ing or not ing.blob:
+            return "The upload was removed before it could be read."
+        sheet = parse_character_sheet(cfg["OLLAMA_URL"], cfg["OLLAMA_MODEL"], ing.text())
+        if isinstance(sheet, str):
+            return sheet
+        char = Character(owner_id=job.user_id, is_npc=False, build_complete=True,
+                         **sheet_import_service.from_ai_sheet(sheet))
+        db.session.add(char)
+        db.session.flush()
+        return {"character_id": char.id, "name": char.name}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_queue: NpcJobQueue | None = None
+
+def init_app(app) -> NpcJobQueue:
+    """Start the worker pool and resume unfinished jobs. Called once from create_app()."""
+    global _queue
+    cfg = app.config
+    _queue = NpcJobQueue(
+        app,
+        max_workers=cfg.get("NPC_JOB_WORKERS", 2),
+        per_user_limit=cfg.get("NPC_JOBS_PER_USER", 2),
+        job_timeout=cfg.get("NPC_JOB_TIMEOUT", 900.0),
+    )
+    with app.app_context():
+        # Fresh install: db.create_all() has not run yet, nothing to resume
+        if db.inspect(db.engine).has_table("users"):
+            NpcJob.__table__.create(db.engine, checkfirst=True)
+            _queue.resume()
+    app.extensions["npc_jobs"] = _queue
+    return _queue
+
+def get_queue() -> NpcJobQueue:
+    if _queue is None:
+        raise RuntimeError("NPC job queue not initialised; call job_service.init_app(app)")
+    return _queue
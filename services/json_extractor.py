@@ -0,0 +1,183 @@
+"""
+Lenient JSON extraction for LLM output.
+JsonExtractor is fed tokens as they stream in and reports the first complete,
+brace-balanced object (or array) so generation can stop as soon as it closes.
+repair_json fixes the usual model mistakes: trailing commas, single-quoted
+strings, unquoted keys, Python literals and raw newlines inside strings.
+"""
+from __future__ import annotations
+import json
+import re
+
+_CLOSERS = {"{": "}", "[": "]"}
+_LITERALS = {"true": "true", "false": "false", "null": "null",
+             "True": "true", "False": "false", "None": "null"}
+_NUMBER_CHARS = set("0123456789+-.eE")
+_LEADING_NUMBER = re.compile(r"\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))")
+
+
+class JsonExtractor:
+    """Incrementally find the first complete JSON value that starts with `opener`."""
+
+    def __init__(self, opener: str = "{"):
+        self.opener = opener
+        self._parts: list[str] = []
+        self._stack: list[str] = []
+        self._quote: str | None = None
+        self._escape = False
+        self.result: str | None = None
+
+    def feed(self, chunk: str) -> str | None:
+        """Consume more text. Returns the complete value once it closes, else None."""
+        if self.result is not None:
+            return self.result
+        for ch in chunk:
+            if not self._stack:
+                if ch != self.opener:
+                    continue
+                self._stack.append(_CLOSERS[ch])
+                self._parts.append(ch)
+                continue
+            self._parts.append(ch)
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch in "\"'":
+                self._quote = ch
+            elif ch in _CLOSERS:
+                self._stack.append(_CLOSERS[ch])
+            elif ch in "}]":
+                if ch == self._stack[-1]:
+                    self._stack.pop()
+                if not self._stack:
+                    self.result = "".join(self._parts)
+                    return self.result
+        return None
+
+
+def extract_json(text: str, opener: str = "{") -> str | None:
+    """First complete JSON value in `text`, or None."""
+    return JsonExtractor(opener).feed(text)
+
+
+def repair_json(text: str) -> str:
+    """Rewrite near-JSON into strict JSON without touching string contents."""
+    out: list[str] = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            j, buf = i + 1, []
+            while j < n and text[j] != ch:
+                c = text[j]
+                if c == "\\" and j + 1 < n:
+                    nxt = text[j + 1]
+                    buf.append("'" if nxt == "'" else c + nxt)
+                    j += 2
+                    continue
+                if c == '"':
+                    buf.append('\\"')
+                elif c == "\n":
+                    buf.append("\\n")
+                elif c == "\t":
+                    buf.append("\\t")
+                else:
+                    buf.append(c)
+                j += 1
+            out.append('"' + "".join(buf) + '"')
+            i = j + 1
+            continue
+        if ch == ",":
+            k = _skip_ws(text, i + 1)
+            if k < n and text[k] in "}]":
+                i += 1
+                continue
+        if ch == "+" and i + 1 < n and text[i + 1].isdigit():
+            i += 1
+            continue
+        if ch.isdigit() or (ch == "-" and i + 1 < n and text[i + 1].isdigit()):
+            j = i + 1
+            while j < n and text[j] in _NUMBER_CHARS:
+                j += 1
+            out.append(text[i:j])
+            i = j
+            continue
+        if ch.isalpha() or ch == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in "_ "):
+                j += 1
+            word = text[i:j].rstrip()
+            k = _skip_ws(text, i + len(word))
+            if k < n and text[k] == ":":
+                out.append(json.dumps(word))
+            elif word in _LITERALS:
+                out.append(_LITERALS[word])
+            else:
+                out.append(json.dumps(word))
+            i += len(word)
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def parse_lenient(text: str):
+    """json.loads, falling back to repair_json. Returns None if neither works."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError:
+        return None
+
+
+def _skip_ws(text: str, i: int) -> int:
+    while i < len(text) and text[i].isspace():
+        i += 1
+    return i
+
+
+# ─── NPC SCHEMA ─────────────────────────────────────────────────────────────
+
+NPC_SCHEMA = {
+    "name": str, "race": str, "char_class": str, "level": int, "alignment": str,
+    "strength": int, "dexterity": int, "constitution": int,
+    "intelligence": int, "wisdom": int, "charisma": int,
+    "armor_class": int, "max_hp": int, "speed": int,
+    "notes": str, "reasoning": str,
+}
+NPC_REQUIRED = ("name", "strength", "dexterity", "constitution", "intelligence",
+                "wisdom", "charisma", "armor_class", "max_hp")
+NPC_DEFAULTS = {"race": "Humanoid", "char_class": "", "level": 1, "alignment": "True Neutral",
+                "speed": 30, "notes": "", "reasoning": ""}
+
+
+def validate_npc(data) -> dict | str:
+    """Coerce an AI stat block to NPC_SCHEMA. Returns the clean dict or an error string."""
+    if not isinstance(data, dict):
+        return "AI response was not a JSON object."
+    missing = [k for k in NPC_REQUIRED if data.get(k) in (None, "")]
+    if missing:
+        return f"AI stat block is missing: {', '.join(missing)}"
+    clean = {}
+    for key, typ in NPC_SCHEMA.items():
+        value = data.get(key, NPC_DEFAULTS.get(key))
+        if typ is int:
+            # "15 (natural armor)" -> 15, "30 ft." -> 30, 7.0 / "15.0" -> 7 / 15
+            m = _LEADING_NUMBER.match(str(value)) if not isinstance(value, bool) else None
+            if m:
+                value = int(float(m.group(1)))
+            elif key in NPC_REQUIRED:
+                return f"AI stat block has a non-numeric {key}: {value!r}"
+            else:
+                value = NPC_DEFAULTS[key]
+        else:
+            value = "" if value is None else str(value)
+        clean[key] = value
+    return clean
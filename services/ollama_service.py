@@ -1,38 +1,363 @@
 from __future__ import annotations
 import requests
 import json
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from services.json_extractor import JsonExtractor, parse_lenient, validate_npc
+
+# ─── SHARED HTTP CLIENT ─────────────────────────────────────────────────────
+
+class OllamaClient:
+    """
+    One pooled, keep-alive HTTP session shared by every Ollama call.
+    Built once per process by init_app(); tracks connection reuse and upstream latency.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 2.0, read_timeout: float = 90.0,
+                 retries: int = 2, backoff: float = 0.3, keep_alive: str = "30m"):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+        # Retry only failures where Ollama never saw the request (connect errors, 502-504);
+        # a read timeout mid-generation is not retried so we never generate twice.
+        retry = Retry(total=retries, connect=retries, read=0, status=retries,
+                      backoff_factor=backoff, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                    max_retries=retry, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._lock = threading.Lock()
+        self._latency = {}   # path -> [count, total_seconds, max_seconds]
+        self._prompt_eval = {}   # path -> [count, prompt_tokens, prompt_eval_ns]
+        self._errors = 0
+
+    def timeout(self, read: float | None = None) -> tuple:
+        return (self.connect_timeout, read if read is not None else self.read_timeout)
+
+    def request(self, method: str, url: str, timeout: float | None = None, **kwargs) -> requests.Response:
+        path = "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+        start = time.perf_counter()
+        try:
+            r = self.session.request(method, url, timeout=self.timeout(timeout), **kwargs)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        # For streamed responses this is time-to-headers, i.e. time to first token
+        self._record(path, time.perf_counter() - start)
+        return r
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, path: str, elapsed: float) -> None:
+        with self._lock:
+            stat = self._latency.setdefault(path, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+
+    def record_eval(self, url: str, body: dict) -> None:
+        """Track Ollama's prompt-eval counters from a final (done) response body."""
+        if "prompt_eval_count" not in body and "prompt_eval_duration" not in body:
+            return
+        path = "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+        with self._lock:
+            stat = self._prompt_eval.setdefault(path, [0, 0, 0])
+            stat[0] += 1
+            stat[1] += body.get("prompt_eval_count", 0)
+            stat[2] += body.get("prompt_eval_duration", 0)
+
+    def stats(self) -> dict:
+        """Connection-reuse and latency counters, for the admin stats endpoint."""
+        requests_sent = connections_opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        with self._lock:
+            latency = {
+                path: {"count": n, "avg_ms": round(total / n * 1000, 1), "max_ms": round(peak * 1000, 1)}
+                for path, (n, total, peak) in self._latency.items()
+            }
+            errors = self._errors
+            prompt_eval = {
+                path: {"count": n, "avg_prompt_tokens": round(tokens / n, 1), "avg_prompt_eval_ms": round(ns / n / 1e6, 1)}
+                for path, (n, tokens, ns) in self._prompt_eval.items()
+            }
+        return {
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": max(0, requests_sent - connections_opened),
+            "errors": errors,
+            "latency": latency,
+            "prompt_eval": prompt_eval,
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class OllamaHealthMonitor:
+    """
+    Probes /api/tags on a background thread every `interval` seconds and keeps
+    the last result in memory, so page renders never wait on the model host.
+    A result older than `ttl` counts as down.
+    """
+
+    def __init__(self, url: str, interval: float = 15.0, ttl: float = 45.0, on_first_probe=None):
+        self.url = url.rstrip("/")
+        self.interval = interval
+        self.ttl = ttl
+        self._on_first_probe = on_first_probe
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._ok = False
+        self._models: list[str] = []
+        self._checked_at = 0.0
+
+    def probe(self) -> bool:
+        try:
+            r = get_client().get(self.url + "/api/tags", timeout=get_client().connect_timeout)
+            ok = r.status_code == 200
+            models = [m.get("name", "") for m in r.json().get("models", [])] if ok else []
+        except Exception:
+            ok, models = False, []
+        with self._lock:
+            self._ok = ok
+            if ok:
+                self._models = models
+            self._checked_at = time.monotonic()
+        return ok
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        self.probe()
+        if self._on_first_probe:
+            self._on_first_probe(self)
+        while not self._stop.wait(self.interval):
+            self.probe()
+
+    def is_ok(self) -> bool:
+        with self._lock:
+            return self._ok and (time.monotonic() - self._checked_at) <= self.ttl
+
+    def models(self) -> list[str]:
+        """Installed models as of the last successful probe."""
+        with self._lock:
+            return list(self._models)
+
+    def has_model(self, name: str) -> bool:
+        # Ollama reports "mistral:latest" for a model pulled as "mistral"
+        wanted = {name, name + ":latest"} if ":" not in name else {name}
+        return any(m in wanted for m in self.models())
+
+    def status(self) -> dict:
+        with self._lock:
+            age = time.monotonic() - self._checked_at if self._checked_at else None
+            return {"ok": self._ok and age is not None and age <= self.ttl,
+                    "models": list(self._models),
+                    "age_seconds": round(age, 1) if age is not None else None}
+
+
+_client: OllamaClient | None = None
+_monitor: OllamaHealthMonitor | None = None
+
+def init_app(app) -> OllamaClient:
+    """Build the shared client and start the health monitor. Called once from create_app()."""
+    global _client, _monitor
+    cfg = app.config
+    _client = OllamaClient(
+        pool_size=cfg.get("OLLAMA_POOL_SIZE", 10),
+        connect_timeout=cfg.get("OLLAMA_CONNECT_TIMEOUT", 2.0),
+        read_timeout=cfg.get("OLLAMA_READ_TIMEOUT", 90.0),
+        retries=cfg.get("OLLAMA_RETRIES", 2),
+        backoff=cfg.get("OLLAMA_BACKOFF", 0.3),
+        keep_alive=cfg.get("OLLAMA_KEEP_ALIVE", "30m"),
+    )
+    app.extensions["ollama"] = _client
+    _sessions.ttl = cfg.get("OLLAMA_SESSION_TTL", 3600.0)
+    _sessions.max_turns = cfg.get("OLLAMA_SESSION_TURNS", 6)
+
+    model = cfg.get("OLLAMA_MODEL", "")
+    def check_model(monitor: OllamaHealthMonitor) -> None:
+        if not monitor.is_ok():
+            app.logger.warning("Ollama not reachable at %s; AI features will use offline fallbacks.", monitor.url)
+        elif model and not monitor.has_model(model):
+            app.logger.warning("OLLAMA_MODEL %r is not installed on %s (installed: %s).",
+                               model, monitor.url, ", ".join(monitor.models()) or "none")
+
+    if _monitor is not None:
+        _monitor.stop()
+    _monitor = OllamaHealthMonitor(
+        cfg["OLLAMA_URL"],
+        interval=cfg.get("OLLAMA_HEALTH_INTERVAL", 15.0),
+        ttl=cfg.get("OLLAMA_HEALTH_TTL", 45.0),
+        on_first_probe=check_model,
+    )
+    _monitor.start()
+    app.extensions["ollama_health"] = _monitor
+    return _client
+
+def get_client() -> OllamaClient:
+    """The shared client; falls back to a default one outside the app (scripts, shells)."""
+    global _client
+    if _client is None:
+        _client = OllamaClient()
+    return _client
+
+# ─── OLLAMA CALLS ───────────────────────────────────────────────────────────
 
 def ollama_health(url: str) -> bool:
     try:
-        r = requests.get(url.rstrip("/") + "/api/tags", timeout=2)
+        r = get_client().get(url.rstrip("/") + "/api/tags", timeout=get_client().connect_timeout)
         return r.status_code == 200
     except Exception:
         return False
 
-def ollama_chat(url: str, model: str, messages: list, timeout: int = 60) -> str:
+def ollama_health_cached(url: str) -> bool:
+    """Last known health from the background monitor; probes directly if none watches `url`."""
+    if _monitor is not None and _monitor.url == url.rstrip("/"):
+        return _monitor.is_ok()
+    return ollama_health(url)
+
+def get_health_monitor() -> OllamaHealthMonitor | None:
+    return _monitor
+
+def ollama_chat(url: str, model: str, messages: list, timeout: float | None = None) -> str:
     try:
-        r = requests.post(
+        r = get_client().post(
             url.rstrip("/") + "/api/chat",
-            json={"model": model, "messages": messages, "stream": False},
+            json={"model": model, "messages": messages, "stream": False, "keep_alive": get_client().keep_alive},
             timeout=timeout
         )
         r.raise_for_status()
-        return r.json().get("message", {}).get("content", "").strip()
+        body = r.json()
+        get_client().record_eval(r.url, body)
+        return body.get("message", {}).get("content", "").strip()
     except Exception as e:
         return f"[AI unavailable: {e}]"
 
-def simple_completion(url: str, model: str, prompt: str, timeout: int = 90) -> str:
+def ollama_chat_stream(url: str, model: str, messages: list, timeout: float | None = None):
+    """Yield reply tokens as Ollama streams them (NDJSON, one object per line).
+
+    Closing the generator (e.g. the client disconnected) closes the upstream
+    response, which cancels the generation on the Ollama side.
+    """
+    try:
+        r = get_client().post(
+            url.rstrip("/") + "/api/chat",
+            json={"model": model, "messages": messages, "stream": True, "keep_alive": get_client().keep_alive},
+            timeout=timeout,
+            stream=True,
+        )
+        r.raise_for_status()
+    except Exception as e:
+        yield f"[AI unavailable: {e}]"
+        return
     try:
-        r = requests.post(
+        for line in r.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                yield f"[AI unavailable: {chunk['error']}]"
+                return
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                yield token
+            if chunk.get("done"):
+                get_client().record_eval(r.url, chunk)
+                return
+    except Exception as e:
+        yield f"[AI unavailable: {e}]"
+    finally:
+        r.close()
+
+def simple_completion(url: str, model: str, prompt: str, timeout: float | None = None) -> str:
+    try:
+        r = get_client().post(
             url.rstrip("/") + "/api/generate",
-            json={"model": model, "prompt": prompt, "stream": False},
+            json={"model": model, "prompt": prompt, "stream": False, "keep_alive": get_client().keep_alive},
             timeout=timeout
         )
         r.raise_for_status()
-        return r.json().get("response", "").strip()
+        body = r.json()
+        get_client().record_eval(r.url, body)
+        return body.get("response", "").strip()
     except Exception as e:
         return f"[AI unavailable: {e}]"
 
+def completion_stream(url: str, model: str, prompt: str, timeout: float | None = None):
+    """Yield /api/generate tokens as they stream in. Closing the generator cancels the generation."""
+    try:
+        r = get_client().post(
+            url.rstrip("/") + "/api/generate",
+            json={"model": model, "prompt": prompt, "stream": True, "keep_alive": get_client().keep_alive},
+            timeout=timeout,
+            stream=True,
+        )
+        r.raise_for_status()
+    except Exception as e:
+        yield f"[AI unavailable: {e}]"
+        return
+    try:
+        for line in r.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                yield f"[AI unavailable: {chunk['error']}]"
+                return
+            token = chunk.get("response", "")
+            if token:
+                yield token
+            if chunk.get("done"):
+                get_client().record_eval(r.url, chunk)
+                return
+    except Exception as e:
+        yield f"[AI unavailable: {e}]"
+    finally:
+        r.close()
+
+def completion_json(url: str, model: str, prompt: str, opener: str = "{", timeout: float | None = None):
+    """
+    Stream a completion until the first complete JSON value (starting with `opener`)
+    closes, then stop the generation. Returns (parsed value or None, raw text seen).
+    """
+    extractor = JsonExtractor(opener)
+    raw_parts = []
+    tokens = completion_stream(url, model, prompt, timeout=timeout)
+    try:
+        for token in tokens:
+            raw_parts.append(token)
+            if extractor.feed(token) is not None:
+                break
+    finally:
+        tokens.close()
+    raw = "".join(raw_parts)
+    if extractor.result is None:
+        return None, raw
+    return parse_lenient(extractor.result), raw
+
 # ─── SRD DATA SUMMARY FOR PROMPTS ───────────────────────────────────────────
 
 SRD_PROMPT_SUMMARY = """
@@ -93,50 +418,97 @@ Spell Attack: proficiency bonus + spellcasting ability modifier
 
 # ─── WIZARD STEP PROMPTS ────────────────────────────────────────────────────
 
-def step_prompt(step: str, build: dict, user_message: str) -> list:
-    """Build a messages list for a specific wizard step."""
-    build_summary = _build_summary(build)
+# Identical for every step, build and turn, and sent first, so Ollama evaluates
+# the SRD block once per loaded model and reuses that prefix afterwards.
+WIZARD_SYSTEM_PROMPT = """You are a D&D 5e expert DM helping a player build their character.
+Answer accurately using only the SRD 5e rules below. Be specific and concise.
+Each player message starts with the wizard step they are on and their current build.
+""" + SRD_PROMPT_SUMMARY
 
-    step_contexts = {
-        "race": f"""You are a D&D 5e expert DM helping a player choose their RACE.
-Current build: {build_summary}
+STEP_INSTRUCTIONS = {
+    "race": """Help the player choose their RACE.
 Explain the chosen race's traits and ability bonuses. Tell the player how this race synergizes (or doesn't) with any class they've mentioned.
 Be specific: give exact bonuses, traits, and how they affect gameplay. Keep it under 120 words. End with one focused question or recommendation.""",
 
-        "class": f"""You are a D&D 5e expert DM helping a player choose their CLASS.
-Current build: {build_summary}
+    "class": """Help the player choose their CLASS.
 Explain the chosen class's role, hit die, primary ability, saving throws, and key level 1-2 features.
 Tell them what ability scores to prioritize given their race choice. Keep it under 150 words. End with a specific tip about their combination.""",
 
-        "background": f"""You are a D&D 5e expert DM helping a player choose their BACKGROUND.
-Current build: {build_summary}
+    "background": """Help the player choose their BACKGROUND.
 Explain the background's skill proficiencies and feature. Tell them how it fits their race+class combo narratively and mechanically.
 Keep it under 100 words.""",
 
-        "abilities": f"""You are a D&D 5e expert DM helping a player assign ABILITY SCORES.
-Current build: {build_summary}
-{SRD_PROMPT_SUMMARY}
+    "abilities": """Help the player assign ABILITY SCORES.
 Given their race and class, recommend exactly how to assign the standard array (15,14,13,12,10,8) to their six stats.
 Be specific: "Put 15 in STR, 14 in CON..." etc. Explain why each placement matters for their class. Under 150 words.""",
 
-        "personality": f"""You are a D&D 5e expert DM helping a player define their CHARACTER PERSONALITY.
-Current build: {build_summary}
+    "personality": """Help the player define their CHARACTER PERSONALITY.
 Help them write a Personality Trait, Ideal, Bond, and Flaw that fit their race/class/background combo.
 Give concrete suggestions — don't be vague. Under 120 words.""",
 
-        "general": f"""You are a D&D 5e expert DM helping a player build their character.
-Current build: {build_summary}
-{SRD_PROMPT_SUMMARY}
-Answer the player's question accurately using SRD 5e rules only. Be specific and concise. Under 150 words.""",
-    }
-
-    system = step_contexts.get(step, step_contexts["general"])
+    "general": """Answer the player's question accurately using SRD 5e rules only. Be specific and concise. Under 150 words.""",
+}
 
+def step_prompt(step: str, build: dict, user_message: str, history: list | None = None) -> list:
+    """Build a messages list for a specific wizard step, after any earlier turns of the session."""
     return [
-        {"role": "system", "content": system + "\n\n" + SRD_PROMPT_SUMMARY},
-        {"role": "user", "content": user_message}
+        {"role": "system", "content": WIZARD_SYSTEM_PROMPT},
+        *(history or []),
+        {"role": "user", "content": step_turn(step, build, user_message)},
     ]
 
+def step_turn(step: str, build: dict, user_message: str) -> str:
+    instructions = STEP_INSTRUCTIONS.get(step, STEP_INSTRUCTIONS["general"])
+    return f"""[{step.upper()} STEP]
+Current build: {_build_summary(build)}
+{instructions}
+
+Player: {user_message}"""
+
+class WizardSessions:
+    """
+    Server-side conversation per wizard page, so follow-up questions keep their
+    context and the message prefix Ollama has already evaluated stays stable.
+    Keeps the last `max_turns` exchanges; idle sessions expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_sessions: int = 500, ttl: float = 3600.0, max_turns: int = 6):
+        from collections import OrderedDict
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._sessions: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def history(self, sid: str, user_id: int) -> list:
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if not entry or entry["user_id"] != user_id or time.monotonic() - entry["touched"] > self.ttl:
+                return []
+            return list(entry["messages"])
+
+    def record(self, sid: str, user_id: int, user_content: str, reply: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if not entry or entry["user_id"] != user_id or now - entry["touched"] > self.ttl:
+                entry = {"user_id": user_id, "messages": []}
+                self._sessions[sid] = entry
+            entry["messages"].extend([
+                {"role": "user", "content": user_content},
+                {"role": "assistant", "content": reply},
+            ])
+            del entry["messages"][:-2 * self.max_turns]
+            entry["touched"] = now
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+_sessions = WizardSessions()
+
+def get_wizard_sessions() -> WizardSessions:
+    return _sessions
+
 def _build_summary(build: dict) -> str:
     parts = []
     if build.get("name"): parts.append(f"Name: {build['name']}")
@@ -183,25 +555,106 @@ Return exactly this JSON structure:
 
 NPC Description: {description}"""
 
-def generate_npc(url: str, model: str, description: str) -> dict | str:
+def generate_npc(url: str, model: str, description: str, retries: int = 1) -> dict | str:
     """Generate a full NPC stat block from a text description. Returns dict or error string."""
     prompt = NPC_GENERATION_PROMPT.format(srd=SRD_PROMPT_SUMMARY, description=description)
-    raw = simple_completion(url, model, prompt, timeout=120)
-
-    # Try to parse JSON from the response
-    import re
-    # Strip markdown code blocks if present
-    raw = re.sub(r'```json\s*', '', raw)
-    raw = re.sub(r'```\s*', '', raw)
-    raw = raw.strip()
-
-    # Find JSON object in response
-    match = re.search(r'\{.*\}', raw, re.DOTALL)
-    if match:
-        try:
-            data = json.loads(match.group())
-            return data
-        except json.JSONDecodeError:
-            pass
+    error = "Could not parse AI response."
+    for _ in range(retries + 1):
+        data, raw = completion_json(url, model, prompt, opener="{")
+        if raw.startswith("[AI unavailable"):
+            return raw
+        if data is None:
+            error = f"Could not parse AI response. Raw: {raw.strip()[:300]}"
+            continue
+        npc = validate_npc(data)
+        if isinstance(npc, dict):
+            return npc
+        error = npc
+    return error
+
+SHEET_TEXT_PROMPT = """You are a D&D 5e expert. Below is the text of a player's character sheet, extracted from a PDF
+(layout is lost, so labels and values may be out of order). Read the character's actual values.
+You MUST respond with ONLY valid JSON — no markdown, no explanation, just the JSON object.
+
+Return exactly this JSON structure:
+{{
+  "name": "string",
+  "race": "string",
+  "char_class": "string (first class if multiclassed)",
+  "level": number (total character level),
+  "alignment": "string",
+  "strength": number,
+  "dexterity": number,
+  "constitution": number,
+  "intelligence": number,
+  "wisdom": number,
+  "charisma": number,
+  "armor_class": number,
+  "max_hp": number,
+  "speed": number,
+  "notes": "string (features, proficiencies and equipment worth keeping)"
+}}
+
+Character sheet text:
+{text}"""
+
+def parse_character_sheet(url: str, model: str, text: str, max_chars: int = 6000) -> dict | str:
+    """Read a flat (non-fillable) character sheet's text into a stat dict. Returns dict or error string."""
+    prompt = SHEET_TEXT_PROMPT.format(text=text[:max_chars])
+    data, raw = completion_json(url, model, prompt, opener="{")
+    if raw.startswith("[AI unavailable"):
+        return raw
+    if data is None:
+        return f"Could not parse AI response. Raw: {raw.strip()[:300]}"
+    return validate_npc(data)
+
+NPC_BATCH_PROMPT = """You are a D&D 5e expert. Generate {count} distinct NPC/monster stat blocks from one description.
+You MUST respond with ONLY a valid JSON array of {count} objects — no markdown, no explanation.
+
+{srd}
 
-    return f"Could not parse AI response. Raw: {raw[:300]}"
+Follow the same D&D 5e rules for every creature (HP from hit dice + CON, AC from DEX or armor,
+proficiency from CR/level). Vary names, and vary stats slightly so the group does not look copy-pasted.
+
+Each array element must have exactly these keys:
+name, race, char_class, level, alignment, strength, dexterity, constitution, intelligence,
+wisdom, charisma, armor_class, max_hp, speed, notes, reasoning
+
+NPC Description: {description}
+{variations}"""
+
+def generate_npc_batch(url: str, model: str, description: str, count: int,
+                       variations: list[str] | None = None, chunk_size: int = 6, parallel: int = 3) -> list[dict] | str:
+    """
+    Generate `count` NPCs from one description. Each prompt asks for up to `chunk_size`
+    creatures as a JSON array, and chunks run `parallel` at a time, so a 12-creature
+    encounter costs about two generations instead of twelve.
+    Returns a list of stat-block dicts, or an error string if nothing could be parsed.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    variations = [v for v in (variations or []) if v and v.strip()]
+    chunks = []
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        hints = [variations[(start + k) % len(variations)] for k in range(n)] if variations else []
+        chunks.append((n, hints))
+
+    def run_chunk(chunk):
+        n, hints = chunk
+        hint_text = ""
+        if hints:
+            hint_text = "Variation for each creature, in order:\n" + "\n".join(
+                f"{k + 1}. {h.strip()}" for k, h in enumerate(hints))
+        prompt = NPC_BATCH_PROMPT.format(count=n, srd=SRD_PROMPT_SUMMARY,
+                                         description=description, variations=hint_text)
+        data, raw = completion_json(url, model, prompt, opener="[")
+        npcs = [npc for npc in map(validate_npc, data if isinstance(data, list) else []) if isinstance(npc, dict)]
+        return npcs[:n], raw
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(chunks)))) as pool:
+        results = list(pool.map(run_chunk, chunks))
+
+    npcs = [npc for chunk_npcs, _ in results for npc in chunk_npcs]
+    if not npcs:
+        return f"Could not parse AI response. Raw: {results[0][1][:300] if results else ''}"
+    return npcs
@@ -1,5 +1,177 @@
+"""
+PDF helpers. Uploads are copied to disk in fixed-size chunks, and text is extracted one
+page per call so the ingest pipeline (services/ingest_service.py) can spread a document
+over a process pool, cap each page's time and store pages as they finish.
+"""
 from __future__ import annotations
+import functools
+import hashlib
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
+
+UPLOAD_CHUNK = 1024 * 1024
+PDF_MAGIC = b"%PDF-"
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def worker_context():
+    """
+    Start method for PDF worker pools. Not fork: forking the threaded web process copies any lock
+    another thread holds at that moment (a module import in progress, say), and the worker then
+    deadlocks on it. forkserver children fork from a clean single-threaded server.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def save_upload(stream, dest: Path, chunk_size: int = UPLOAD_CHUNK) -> tuple[int, str]:
+    """
+    Copy an upload stream to `dest` chunk by chunk (never the whole file in memory),
+    hashing as it goes. Returns (bytes written, SHA-256 hex digest).
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    os.replace(tmp, dest)
+    return size, digest.hexdigest()
+
+
+def hash_file(path: Path, chunk_size: int = UPLOAD_CHUNK) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def looks_like_pdf(path: Path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(1024).lstrip().startswith(PDF_MAGIC)
+
+
+def _open(pdf_path: str):
+    from pypdf import PdfReader  # type: ignore
+    return PdfReader(pdf_path)
+
+
+@functools.lru_cache(maxsize=1)
+def _worker_reader(pdf_path: str, mtime: float):
+    # One open reader per worker process: consecutive pages of the same file reuse the parsed
+    # xref. Only extract_page() uses it; callers in the web process get a reader of their own.
+    return _open(pdf_path)
+
+
+def page_count(pdf_path: str) -> int:
+    return len(_open(pdf_path).pages)
+
+
+def form_fields(pdf_path: str) -> dict[str, str]:
+    """
+    Filled-in AcroForm values by fully qualified field name (text boxes and checkboxes); {} for
+    flat PDFs. Walks /Fields reading only /T, /V and /Kids: pypdf's get_fields() also resolves every
+    widget's appearance streams, several times the work on a sheet with a few hundred fields.
+    """
+    return _form_fields(_open(pdf_path))
+
+
+def describe(pdf_path: str, timeout: float | None = None) -> tuple[int, dict[str, str]]:
+    """
+    (page count, form_fields) from a single parse; the ingest pipeline runs it in a worker
+    process. Raises PageTimeout past `timeout`, and pypdf's errors for unreadable files.
+    """
+    with _time_limit(timeout):
+        reader = _open(pdf_path)
+        return len(reader.pages), _form_fields(reader)
+
+
+def _form_fields(reader) -> dict[str, str]:
+    acroform = reader.trailer["/Root"].get("/AcroForm")
+    if acroform is None:
+        return {}
+    values = {}
+    stack = [(ref, "") for ref in acroform.get_object().get("/Fields", ())]
+    while stack:
+        ref, parent = stack.pop()
+        field = ref.get_object()
+        partial = field.get("/T")
+        name = f"{parent}.{partial}" if parent and partial else str(partial or parent)
+        value = field.get("/V")
+        value = value.get_object() if value is not None else None
+        if value not in (None, "") and not isinstance(value, (list, dict)):
+            values[name] = str(value)
+        stack.extend((kid, name) for kid in field.get("/Kids", ()))
+    return values
+
+
+def _on_alarm(signum, frame):
+    raise PageTimeout()
+
+
+@contextmanager
+def _time_limit(timeout: float | None):
+    """Raise PageTimeout in the block after `timeout` seconds (SIGALRM: POSIX main thread only)."""
+    use_alarm = bool(timeout) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _page_text(reader, page_no: int, timeout: float | None) -> tuple[str, str]:
+    try:
+        with _time_limit(timeout):
+            return reader.pages[page_no].extract_text() or "", "ok"
+    except PageTimeout:
+        return "", "timeout"
+    except Exception:
+        return "", "error"
+
+
+def extract_page(pdf_path: str, page_no: int, timeout: float | None = None) -> tuple[int, str, str, int]:
+    """
+    Extract one page's text. Meant to run in a worker process. Returns
+    (page_no, status, text, elapsed_ms) with status ok | timeout | error; never raises.
+    The time limit uses SIGALRM where available (POSIX, main thread); elsewhere the
+    caller's own deadline is the only limit.
+    """
+    start = time.perf_counter()
+    try:
+        reader = _worker_reader(pdf_path, os.path.getmtime(pdf_path))
+    except Exception:
+        return page_no, "error", "", int((time.perf_counter() - start) * 1000)
+    text, status = _page_text(reader, page_no, timeout)
+    return page_no, status, text, int((time.perf_counter() - start) * 1000)
+
+
+def iter_page_text(pdf_path: str) -> Iterator[str]:
+    """Page texts in order, in this process, one page at a time."""
+    reader = _open(pdf_path)
+    for n in range(len(reader.pages)):
+        yield _page_text(reader, n, None)[0]
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     p = Path(pdf_path)
@@ -7,11 +179,6 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         return ""
 
     try:
-        from pypdf import PdfReader  # type: ignore
-        reader = PdfReader(str(p))
-        parts = []
-        for page in reader.pages:
-            parts.append(page.extract_text() or "")
-        return "\n\n".join(parts).strip()
+        return "\n\n".join(iter_page_text(str(p))).strip()
     except Exception:
-        return ""
\ No newline at end of file
+        return ""
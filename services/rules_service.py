@@ -0,0 +1,135 @@
+"""
+Derived-stats engine: one pass from base scores + race/class/background/level
+to a complete, typed character record (scores with racial bonuses, modifiers,
+saves, skills, HP, AC, features). Results are memoized on the input tuple, so
+create, NPC import and the sheet view never recompute the same build.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from services import srd_service
+
+ABILITIES = ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma")
+ABILITY_LABELS = ("Strength", "Dexterity", "Constitution", "Intelligence", "Wisdom", "Charisma")
+_ABILITY_INDEX = {a: i for i, a in enumerate(ABILITIES)}
+
+
+@dataclass(frozen=True, slots=True)
+class SaveLine:
+    label: str
+    ability: str
+    proficient: bool
+    modifier: int
+
+
+@dataclass(frozen=True, slots=True)
+class SkillLine:
+    name: str
+    ability: str
+    proficient: bool
+    modifier: int
+
+
+@dataclass(frozen=True, slots=True)
+class SheetLines:
+    """Everything the sheet derives from scores + proficiencies."""
+    modifiers: tuple[int, ...]
+    saves: tuple[SaveLine, ...]
+    skills: tuple[SkillLine, ...]
+    passive_perception: int
+
+    def modifier(self, ability: str) -> int:
+        return self.modifiers[_ABILITY_INDEX[ability]]
+
+
+@dataclass(frozen=True, slots=True)
+class DerivedStats:
+    level: int
+    proficiency_bonus: int
+    base_scores: tuple[int, ...]
+    scores: tuple[int, ...]
+    lines: SheetLines
+    max_hp: int
+    armor_class: int
+    initiative: int
+    speed: int
+    hit_dice: str
+    features: tuple[str, ...]
+    equipment: tuple[str, ...]
+
+    def score(self, ability: str) -> int:
+        return self.scores[_ABILITY_INDEX[ability]]
+
+    def modifier(self, ability: str) -> int:
+        return self.lines.modifier(ability)
+
+    @property
+    def skill_proficiencies(self) -> tuple[str, ...]:
+        return tuple(s.name for s in self.lines.skills if s.proficient)
+
+    @property
+    def save_proficiencies(self) -> tuple[str, ...]:
+        return tuple(s.label for s in self.lines.saves if s.proficient)
+
+
+@lru_cache(maxsize=4096)
+def sheet_lines(scores: tuple[int, ...], proficiency_bonus: int,
+                skill_profs: frozenset = frozenset(), save_profs: frozenset = frozenset()) -> SheetLines:
+    mods = tuple(srd_service.ability_modifier(s) for s in scores)
+    saves = tuple(
+        SaveLine(label, ability, label in save_profs, mods[i] + (proficiency_bonus if label in save_profs else 0))
+        for i, (ability, label) in enumerate(zip(ABILITIES, ABILITY_LABELS))
+    )
+    skills = tuple(
+        SkillLine(sk.name, sk.ability, sk.name in skill_profs,
+                  mods[_ABILITY_INDEX[sk.ability]] + (proficiency_bonus if sk.name in skill_profs else 0))
+        for sk in srd_service.ALL_SKILLS
+    )
+    perception = next(s.modifier for s in skills if s.name == "Perception")
+    return SheetLines(mods, saves, skills, 10 + perception)
+
+
+@lru_cache(maxsize=4096)
+def derive(base_scores: tuple[int, ...], race: str | None, char_class: str | None,
+           background: str | None, level: int, apply_racial_bonuses: bool = True) -> DerivedStats:
+    """Compute the full derived record for a build. All arguments must be hashable."""
+    srd_race = srd_service.get_race(race or "")
+    srd_class = srd_service.get_class(char_class or "")
+    srd_bg = srd_service.get_background(background or "")
+    level = max(1, min(30, level))
+
+    scores = list(base_scores)
+    if srd_race and apply_racial_bonuses:
+        for ability, bonus in srd_race.ability_bonuses.items():
+            i = _ABILITY_INDEX[ability]
+            scores[i] = min(30, scores[i] + bonus)
+    scores = tuple(scores)
+
+    prof = srd_service.proficiency_bonus(min(level, srd_service.MAX_LEVEL))
+    lines = sheet_lines(
+        scores, prof,
+        frozenset(srd_bg.skill_proficiencies if srd_bg else ()),
+        frozenset(srd_class.saving_throws if srd_class else ()),
+    )
+    dex = lines.modifier("dexterity")
+    con = lines.modifier("constitution")
+
+    hit_die = srd_class.hit_die if srd_class else "d8"
+    die = srd_class.hit_die_value if srd_class else 8
+    max_hp = max(1, die + con + (level - 1) * (die // 2 + 1 + con))
+    armor_class = 10 + dex
+
+    return DerivedStats(
+        level=level,
+        proficiency_bonus=prof,
+        base_scores=tuple(base_scores),
+        scores=scores,
+        lines=lines,
+        max_hp=max_hp,
+        armor_class=armor_class,
+        initiative=dex,
+        speed=srd_race.speed if srd_race else 30,
+        hit_dice=f"{level}{hit_die}",
+        features=srd_class.features_at(level) if srd_class else (),
+        equipment=srd_bg.equipment if srd_bg else (),
+    )
@@ -0,0 +1,152 @@
+"""
+Tiny forward-only schema migrations for existing databases.
+db.create_all() builds new tables with every index declared on the models, but it never
+alters tables that already exist. Each migration here brings an older database up to date;
+the applied version is recorded in app_meta ("schema_version"). Steps must be idempotent
+(a fresh create_all database runs them too) and should reuse the model definitions.
+"""
+from __future__ import annotations
+import sqlite3
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+from db import db
+from models import AppMeta, PdfBlob, PdfPage, SHEET_DOC_SECTIONS, SHEET_DOC_VERSION
+
+VERSION_KEY = "schema_version"
+
+
+def _model_index(name: str):
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(f"No index named {name!r} is declared on the models")
+
+
+def _create_indexes(*names: str):
+    def step(conn) -> None:
+        for name in names:
+            _model_index(name).create(conn, checkfirst=True)
+    return step
+
+
+def _m001_hot_path_indexes(conn) -> None:
+    # Superseded by ix_campaigns_active_name (is_active, name NOCASE)
+    conn.execute(text("DROP INDEX IF EXISTS ix_campaigns_name_nocase"))
+    _create_indexes(
+        "ix_users_role_username",
+        "ix_campaigns_active_name",
+        "ix_campaigns_dm_created",
+        "ix_campaigns_created",
+        "ix_memberships_user_approved",
+        "ix_templates_owner_kind_used",
+        "ix_characters_campaign_npc",
+        "ix_characters_owner_campaign",
+    )(conn)
+    conn.execute(text("ANALYZE"))
+
+
+def _m002_content_addressed_pdfs(conn) -> None:
+    inspector = db.inspect(conn)
+    if not inspector.has_table("pdf_ingestions"):
+        return  # ingest_service creates the current tables
+    PdfBlob.__table__.create(conn, checkfirst=True)
+    if "sha256" not in {c["name"] for c in inspector.get_columns("pdf_ingestions")}:
+        conn.execute(text("ALTER TABLE pdf_ingestions ADD COLUMN sha256 VARCHAR(64) REFERENCES pdf_blobs (sha256)"))
+        conn.execute(text("ALTER TABLE pdf_ingestions ADD COLUMN cached BOOLEAN NOT NULL DEFAULT 0"))
+        _create_indexes("ix_pdf_ingestions_sha256")(conn)
+    if inspector.has_table("pdf_pages") and "ingestion_id" in {c["name"] for c in inspector.get_columns("pdf_pages")}:
+        # Pages were kept per upload; they are now cached per file hash. Re-extract into the new cache
+        # (ingest_service hashes and moves the old files on the way).
+        conn.execute(text("DROP TABLE pdf_pages"))
+        conn.execute(text("UPDATE pdf_ingestions SET status = 'queued', pages_done = 0, pages_failed = 0, "
+                          "started_at = NULL, finished_at = NULL, error = NULL WHERE sha256 IS NULL"))
+    PdfPage.__table__.create(conn, checkfirst=True)
+
+
+def _m003_character_sheet_document(conn) -> None:
+    columns = {c["name"] for c in db.inspect(conn).get_columns("characters")}
+    if "sheet_doc" not in columns:
+        conn.execute(text("ALTER TABLE characters ADD COLUMN sheet_doc JSON NOT NULL DEFAULT '{}'"))
+    legacy = [f"{section}_json" for section in SHEET_DOC_SECTIONS]
+    if not set(legacy) <= columns:
+        return
+    # Fold the seven JSON text columns into the document in one statement; invalid JSON becomes empty
+    parts = ", ".join(
+        f"'{section}', CASE WHEN json_valid({section}_json) THEN json({section}_json) "
+        f"ELSE json('{'[]' if kind is list else '{}'}') END"
+        for section, kind in SHEET_DOC_SECTIONS.items())
+    conn.execute(text(f"UPDATE characters SET sheet_doc = json_object('v', :v, {parts})"), {"v": SHEET_DOC_VERSION})
+    if sqlite3.sqlite_version_info >= (3, 35, 0):  # ALTER TABLE ... DROP COLUMN; older SQLite keeps them unused
+        for column in legacy:
+            conn.execute(text(f"ALTER TABLE characters DROP COLUMN {column}"))
+
+
+def _m004_npc_job_kinds(conn) -> None:
+    # npc_jobs predates batch jobs; tables created before them lack kind and params_json
+    if not db.inspect(conn).has_table("npc_jobs"):
+        return
+    columns = {c["name"] for c in db.inspect(conn).get_columns("npc_jobs")}
+    if "kind" not in columns:
+        conn.execute(text("ALTER TABLE npc_jobs ADD COLUMN kind VARCHAR(20) NOT NULL DEFAULT 'single'"))
+    if "params_json" not in columns:
+        conn.execute(text("ALTER TABLE npc_jobs ADD COLUMN params_json TEXT DEFAULT '{}'"))
+
+
+def _m005_pdf_heartbeats(conn) -> None:
+    for table in ("pdf_blobs", "pdf_ingestions"):
+        if not db.inspect(conn).has_table(table):
+            continue
+        if "heartbeat_at" not in {c["name"] for c in db.inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN heartbeat_at DATETIME"))
+
+
+# (version, description, step(conn)) - append only, never renumber
+MIGRATIONS = [
+    (1, "Composite indexes for campaign, membership, character and template queries", _m001_hot_path_indexes),
+    (2, "Content-addressed PDF uploads with a per-hash extraction cache", _m002_content_addressed_pdfs),
+    (3, "Character JSON columns folded into one versioned sheet document", _m003_character_sheet_document),
+    (4, "NPC job kind and parameters for batch generation", _m004_npc_job_kinds),
+    (5, "Heartbeats on PDF extraction so stalled work can be taken over", _m005_pdf_heartbeats),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version() -> int:
+    marker = db.session.get(AppMeta, VERSION_KEY)
+    return int(marker.value) if marker and marker.value.isdigit() else 0
+
+
+def migrate() -> list[int]:
+    """Apply pending migrations in order, each in its own transaction. Returns the versions applied."""
+    AppMeta.__table__.create(db.engine, checkfirst=True)
+    version = current_version()
+    db.session.remove()
+    applied = []
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        current_app.logger.info("Applying schema migration %d: %s", number, description)
+        with db.engine.begin() as conn:
+            step(conn)
+            meta = AppMeta.__table__
+            conn.execute(meta.delete().where(meta.c.key == VERSION_KEY))
+            conn.execute(meta.insert().values(key=VERSION_KEY, value=str(number), updated_at=datetime.utcnow()))
+        applied.append(number)
+    return applied
+
+
+def init_app(app) -> None:
+    """Bring an existing database up to date at startup and register `flask db-upgrade`."""
+    with app.app_context():
+        # Fresh install: db.create_all() has not run yet and will build the indexes itself
+        if db.inspect(db.engine).has_table("users"):
+            migrate()
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade_command():
+        """Create missing tables and apply pending schema migrations."""
+        db.create_all()
+        applied = migrate()
+        print(f"Schema at version {LATEST}" + (f" (applied {applied})" if applied else " (up to date)"))
@@ -0,0 +1,146 @@
+"""
+Pluggable Flask session backends, picked by SESSION_BACKEND:
+  sqlite     - one SQLite file with an indexed expiry column, periodic sweep + incremental vacuum (default)
+  cookie     - Flask's stateless signed cookie; only with a private SECRET_KEY, since it holds the role
+  filesystem - the original Flask-Session file store under data/sessions
+"""
+from __future__ import annotations
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+from config import PLACEHOLDER_SECRET_KEYS
+
+
+class SqliteSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid: str | None = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class SqliteSessionInterface(SessionInterface):
+    """
+    Server-side sessions in a single SQLite table. Reads are one primary-key lookup; a row is
+    only rewritten when the session changed or its expiry is more than `refresh_after` stale,
+    so ordinary page views never write. Expired rows are swept every `sweep_interval` seconds.
+    """
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600, sweep_interval: float = 600,
+                 refresh_after: float = 3600):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.refresh_after = refresh_after
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        # auto_vacuum must be set before the first table exists to take effect
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires ON sessions (expires_at)")
+
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt="cf-session")
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode("ascii")
+            except BadSignature:
+                sid = None
+            if sid:
+                with self._lock:
+                    row = self._db.execute(
+                        "SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?",
+                        (sid, time.time()),
+                    ).fetchone()
+                if row:
+                    session = SqliteSession(self.serializer.loads(row[0]), sid=sid)
+                    session.expires_at = row[1]
+                    return session
+        return SqliteSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        now = time.time()
+
+        if not session:
+            if not session.new:
+                with self._lock:
+                    self._db.execute("DELETE FROM sessions WHERE id = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds() if session.permanent else self.ttl
+        stale = now + ttl - getattr(session, "expires_at", 0) > self.refresh_after
+        if session.modified or session.new or stale:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                    (session.sid, self.serializer.dumps(dict(session)), now + ttl),
+                )
+            self._maybe_sweep(now)
+
+        if session.new or session.modified or stale:
+            response.set_cookie(
+                name, self._signer(app).sign(session.sid).decode("ascii"),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+            )
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        with self._lock:
+            self._last_sweep = now
+            self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            self._db.execute("PRAGMA incremental_vacuum")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total, expired = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(expires_at <= ?), 0) FROM sessions", (time.time(),)
+            ).fetchone()
+        return {"backend": "sqlite", "sessions": total, "expired_pending_sweep": expired}
+
+
+def init_app(app) -> None:
+    """Install the configured session backend. Called once from create_app()."""
+    backend = (app.config.get("SESSION_BACKEND") or "sqlite").lower()
+    if backend == "sqlite":
+        app.session_interface = SqliteSessionInterface(
+            app.config["SESSION_SQLITE_PATH"],
+            ttl=app.config.get("SESSION_SQLITE_TTL", 7 * 24 * 3600),
+            sweep_interval=app.config.get("SESSION_SWEEP_INTERVAL", 600),
+        )
+    elif backend == "filesystem":
+        from flask_session import Session
+        Path(app.config["SESSION_FILE_DIR"]).mkdir(parents=True, exist_ok=True)
+        Session(app)
+    elif backend == "cookie":
+        # The cookie carries user_id and role, so anyone who knows the key can forge an admin session
+        if not app.config.get("SECRET_KEY") or app.config["SECRET_KEY"] in PLACEHOLDER_SECRET_KEYS:
+            raise RuntimeError("SESSION_BACKEND=cookie needs SECRET_KEY set to a private random value")
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}; use cookie, sqlite or filesystem")
+    # "cookie" is Flask's built-in SecureCookieSessionInterface, signed with SECRET_KEY
+    app.extensions["session_backend"] = backend
@@ -0,0 +1,165 @@
+"""
+Turn an uploaded character-sheet PDF into Character columns.
+Fillable 5e sheets (the official WotC sheet and the many exports that copy its field names)
+carry every value in their AcroForm dictionary, so `from_form_fields` maps them straight onto
+the model in one cheap pass. Only flat PDFs need the slow route: page text plus an AI read
+(ollama_service.parse_character_sheet), mapped by `from_ai_sheet`.
+"""
+from __future__ import annotations
+import re
+from models import new_sheet_doc
+from services import rules_service, srd_service
+
+# Character column -> AcroForm field names (official sheet first). Names are compared with
+# _field_key, so "Race ", "RACE" and "race" are the same field.
+TEXT_FIELDS = {
+    "name": ("CharacterName", "Character Name"),
+    "race": ("Race", "Race/Species"),
+    "background": ("Background",),
+    "alignment": ("Alignment",),
+    "hit_dice": ("HDTotal", "HD", "Hit Dice"),
+}
+INT_FIELDS = {
+    "strength": ("STR", "Strength"),
+    "dexterity": ("DEX", "Dexterity"),
+    "constitution": ("CON", "Constitution"),
+    "intelligence": ("INT", "Intelligence"),
+    "wisdom": ("WIS", "Wisdom"),
+    "charisma": ("CHA", "Charisma"),
+    "experience_points": ("XP", "Experience Points", "EXP"),
+    "armor_class": ("AC", "Armor Class"),
+    "initiative": ("Initiative", "Init"),
+    "speed": ("Speed",),
+    "max_hp": ("HPMax", "Max HP", "MaxHP", "Hit Point Maximum"),
+    "current_hp": ("HPCurrent", "Current HP", "CurrentHP"),
+    "temp_hp": ("HPTemp", "Temp HP", "TempHP"),
+    "proficiency_bonus": ("ProfBonus", "Proficiency Bonus", "ProBonus"),
+}
+CLASS_LEVEL_FIELDS = ("ClassLevel", "Class & Level", "Class Level")
+TRAIT_FIELDS = {"personality": ("PersonalityTraits",), "ideal": ("Ideals",), "bond": ("Bonds",), "flaw": ("Flaws",)}
+FEATURE_FIELDS = ("Features and Traits", "FeaturesTraits", "Features & Traits")
+EQUIPMENT_FIELDS = ("Equipment",)
+NOTE_FIELDS = ("ProficienciesLang", "Other Proficiencies & Languages")
+
+# Proficiency checkboxes on the official sheet: saves are boxes 11 and 18-22, skills 23-40 in SRD order
+SAVE_CHECKBOXES = dict(zip(("Check Box 11", "Check Box 18", "Check Box 19", "Check Box 20", "Check Box 21",
+                            "Check Box 22"), rules_service.ABILITY_LABELS))
+SKILL_CHECKBOXES = {f"Check Box {23 + i}": s.name for i, s in enumerate(srd_service.ALL_SKILLS)}
+UNCHECKED = {"", "/Off", "Off", "0", "false", "False", "None"}
+
+# A form counts as a character sheet once this many ability scores read as numbers
+MIN_ABILITY_FIELDS = 3
+
+
+def _field_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.casefold())
+
+
+def _first_int(value: str | None) -> int | None:
+    """'+3' -> 3, '30 ft.' -> 30, '15 (chain mail)' -> 15"""
+    m = re.search(r"[-+]?\d+", value or "")
+    return int(m.group()) if m else None
+
+
+def _lines(value: str | None) -> list[str]:
+    return [line.strip(" -•\t") for line in re.split(r"[\r\n]+", value or "") if line.strip(" -•\t")]
+
+
+def parse_class_level(value: str) -> tuple[str | None, str | None, int]:
+    """'Fighter 3', 'Wizard (Evoker) 5', 'Fighter 3 / Rogue 2' -> (class, subclass, total level)."""
+    levels = [int(n) for n in re.findall(r"\d+", value or "")]
+    first = re.split(r"[/,]", value or "")[0]
+    m = re.match(r"\s*([A-Za-z][A-Za-z' -]*?)\s*(?:\(([^)]*)\))?\s*\d*\s*$", first)
+    level = max(1, min(20, sum(levels) or 1))
+    if not m:
+        return None, None, level
+    cls = srd_service.get_class(m.group(1))
+    return (cls.name if cls else m.group(1).strip()) or None, (m.group(2) or "").strip() or None, level
+
+
+def from_form_fields(fields: dict[str, str]) -> dict | None:
+    """
+    Map a PDF's AcroForm values (pdf_service.form_fields) to Character column values.
+    Returns None when the form is not a recognisable 5e character sheet.
+    """
+    by_key = {_field_key(k): v for k, v in fields.items()}
+
+    def get(names: tuple[str, ...]) -> str | None:
+        for name in names:
+            value = by_key.get(_field_key(name))
+            if value not in (None, ""):
+                return str(value).strip()
+        return None
+
+    ints = {col: _first_int(get(names)) for col, names in INT_FIELDS.items()}
+    if sum(ints[a] is not None for a in rules_service.ABILITIES) < MIN_ABILITY_FIELDS:
+        return None
+
+    cols = {col: (get(names) or None) for col, names in TEXT_FIELDS.items()}
+    char_class, subclass, level = parse_class_level(get(CLASS_LEVEL_FIELDS) or "")
+    cols.update(char_class=char_class, subclass=subclass, level=level)
+
+    scores = tuple(max(1, min(30, ints[a] if ints[a] is not None else 10)) for a in rules_service.ABILITIES)
+    cols.update(zip(rules_service.ABILITIES, scores))
+    max_hp = max(1, ints["max_hp"] or 1)
+    cols.update(
+        experience_points=max(0, ints["experience_points"] or 0),
+        armor_class=max(1, min(40, ints["armor_class"] or 10 + srd_service.ability_modifier(scores[1]))),
+        initiative=ints["initiative"] if ints["initiative"] is not None else srd_service.ability_modifier(scores[1]),
+        speed=max(0, min(200, ints["speed"] if ints["speed"] is not None else 30)),
+        max_hp=max_hp,
+        current_hp=max(0, min(max_hp, ints["current_hp"])) if ints["current_hp"] is not None else max_hp,
+        temp_hp=max(0, ints["temp_hp"] or 0),
+        proficiency_bonus=ints["proficiency_bonus"] or srd_service.proficiency_bonus(level),
+    )
+
+    def checked(name: str) -> bool:
+        return str(fields.get(name, "")).strip() not in UNCHECKED
+
+    skills = {skill: True for box, skill in SKILL_CHECKBOXES.items() if checked(box)}
+    # Exports that name their proficiency boxes after the skill ("StealthProf", "Stealth Prof")
+    for skill in srd_service.SKILL_ABILITY:
+        value = by_key.get(_field_key(skill) + "prof")
+        if value is not None and str(value).strip() not in UNCHECKED:
+            skills[skill] = True
+    saves = {ability: True for box, ability in SAVE_CHECKBOXES.items() if checked(box)}
+    traits = {trait: get(names) or "" for trait, names in TRAIT_FIELDS.items()}
+    notes = get(NOTE_FIELDS)
+    cols.update(
+        sheet_doc=new_sheet_doc(skills=skills, saving_throws=saves, features=_lines(get(FEATURE_FIELDS)),
+                                equipment=_lines(get(EQUIPMENT_FIELDS)), traits=traits),
+        notes=f"Proficiencies & languages:\n{notes}" if notes else "",
+    )
+    for col, limit in (("name", 200), ("race", 80), ("background", 80), ("alignment", 40), ("hit_dice", 20),
+                       ("char_class", 80), ("subclass", 80)):
+        if cols.get(col):
+            cols[col] = cols[col][:limit]
+    cols["name"] = cols["name"] or "(unnamed)"
+    return cols
+
+
+def from_ai_sheet(sheet: dict) -> dict:
+    """Map a validated AI read of a flat sheet (ollama_service.parse_character_sheet) to column values."""
+    level = max(1, min(20, sheet["level"]))
+    scores = tuple(max(1, min(30, sheet[a])) for a in rules_service.ABILITIES)
+    stats = rules_service.derive(scores, sheet.get("race"), sheet.get("char_class"), None, level,
+                                 apply_racial_bonuses=False)
+    max_hp = max(1, sheet["max_hp"])
+    cols = dict(zip(rules_service.ABILITIES, scores))
+    cols.update(
+        name=(sheet.get("name") or "(unnamed)")[:200],
+        level=level,
+        char_class=(sheet.get("char_class") or "")[:80] or None,
+        race=(sheet.get("race") or "")[:80] or None,
+        alignment=(sheet.get("alignment") or "")[:40] or None,
+        max_hp=max_hp, current_hp=max_hp,
+        armor_class=max(1, min(40, sheet["armor_class"])),
+        initiative=stats.initiative,
+        speed=max(0, min(200, sheet["speed"])),
+        proficiency_bonus=stats.proficiency_bonus,
+        hit_dice=stats.hit_dice if stats.features else None,
+        sheet_doc=new_sheet_doc(saving_throws={s: True for s in stats.save_proficiencies},
+                                features=list(stats.features)),
+        notes=sheet.get("notes") or "",
+    )
+    return cols
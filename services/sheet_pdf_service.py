@@ -0,0 +1,298 @@
+"""
+Character sheets rendered to PDF with reportlab, from Character.to_sheet_dict().
+Rendered files are cached on disk keyed by character id + updated_at (+ RENDER_VERSION, bumped
+whenever the layout changes), so repeat downloads are a file send and the key doubles as the
+ETag. Campaign exports render the uncached sheets in a process pool and stream one zip as
+sheets finish.
+"""
+from __future__ import annotations
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+from services.pdf_service import worker_context
+
+RENDER_VERSION = 1
+
+
+def render_sheet_pdf(data: dict) -> bytes:
+    """One character sheet as PDF bytes. Pure function of the sheet dict, so it can run in a worker process."""
+    from io import BytesIO
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    buf = BytesIO()
+    width, height = letter
+    margin = 40
+    cv = canvas.Canvas(buf, pagesize=letter, pageCompression=1)
+    cv.setTitle(data.get("name") or "Character")
+    y = height - margin
+
+    def sign(n) -> str:
+        return f"+{n}" if (n or 0) >= 0 else str(n)
+
+    def need(h: float) -> None:
+        nonlocal y
+        if y - h < margin:
+            cv.showPage()
+            y = height - margin
+
+    def dot(x: float, row_y: float, filled: bool) -> None:
+        cv.circle(x + 3, row_y + 3, 3, stroke=1, fill=1 if filled else 0)
+
+    def heading(text: str) -> None:
+        nonlocal y
+        need(30)
+        y -= 8
+        cv.setFont("Helvetica-Bold", 11)
+        cv.drawString(margin, y, text.upper())
+        cv.line(margin, y - 3, width - margin, y - 3)
+        y -= 16
+
+    def paragraph(text: str, size: int = 9) -> None:
+        nonlocal y
+        cv.setFont("Helvetica", size)
+        for line in simpleSplit(str(text), "Helvetica", size, width - 2 * margin):
+            need(size + 3)
+            cv.drawString(margin, y, line)
+            y -= size + 3
+
+    # Header
+    cv.setFont("Helvetica-Bold", 20)
+    cv.drawString(margin, y - 6, data.get("name") or "(unnamed)")
+    y -= 24
+    cv.setFont("Helvetica", 10)
+    cls = data.get("char_class") or "—"
+    if data.get("subclass"):
+        cls += f" ({data['subclass']})"
+    cv.drawString(margin, y, f"{data.get('race') or '—'} · {cls} · Level {data.get('level')} · "
+                             f"{data.get('background') or '—'} · {data.get('alignment') or '—'}"
+                             + (" · NPC" if data.get("is_npc") else ""))
+    y -= 26
+
+    # Ability scores
+    box_w = (width - 2 * margin) / 6
+    for i, save in enumerate(data.get("save_lines") or ()):
+        x = margin + i * box_w
+        cv.roundRect(x + 3, y - 52, box_w - 6, 56, 4)
+        cv.setFont("Helvetica-Bold", 8)
+        cv.drawCentredString(x + box_w / 2, y - 8, save.label[:3].upper())
+        cv.setFont("Helvetica-Bold", 18)
+        cv.drawCentredString(x + box_w / 2, y - 29, str(data.get(save.ability)))
+        cv.setFont("Helvetica", 9)
+        cv.drawCentredString(x + box_w / 2, y - 44, sign(data.get(f"{save.ability[:3]}_mod")))
+    y -= 70
+
+    # Combat line
+    combat = [("AC", data.get("armor_class")), ("Initiative", sign(data.get("initiative"))),
+              ("Speed", f"{data.get('speed')} ft"), ("HP", f"{data.get('current_hp')}/{data.get('max_hp')}"),
+              ("Temp HP", data.get("temp_hp") or 0), ("Hit Dice", data.get("hit_dice") or "—"),
+              ("Prof.", sign(data.get("proficiency_bonus"))), ("Passive Perc.", data.get("passive_perception"))]
+    col_w = (width - 2 * margin) / len(combat)
+    for i, (label, value) in enumerate(combat):
+        x = margin + i * col_w + col_w / 2
+        cv.setFont("Helvetica-Bold", 12)
+        cv.drawCentredString(x, y, str(value))
+        cv.setFont("Helvetica", 7)
+        cv.drawCentredString(x, y - 11, label.upper())
+    y -= 28
+
+    # Saves (left) and skills (right)
+    heading("Saving Throws & Skills")
+    top = y
+    cv.setFont("Helvetica", 9)
+    for save in data.get("save_lines") or ():
+        dot(margin, y, save.proficient)
+        cv.drawString(margin + 10, y, f"{sign(save.modifier):>3}  {save.label}")
+        y -= 13
+    y_saves = y
+    y = top
+    half = (len(data.get("skill_lines") or ()) + 1) // 2
+    for i, skill in enumerate(data.get("skill_lines") or ()):
+        x = margin + 170 + (i // half) * 180
+        row_y = top - (i % half) * 13
+        dot(x, row_y, skill.proficient)
+        cv.drawString(x + 10, row_y, f"{sign(skill.modifier):>3}  {skill.name} ({skill.ability[:3].upper()})")
+    y = min(y_saves, top - half * 13) - 4
+
+    if data.get("features"):
+        heading("Features & Traits")
+        paragraph(" · ".join(str(f) for f in data["features"]))
+    if data.get("equipment"):
+        heading("Equipment")
+        paragraph(", ".join(str(e) for e in data["equipment"]))
+    traits = data.get("traits") or {}
+    if any(traits.get(k) for k in ("personality", "ideal", "bond", "flaw")):
+        heading("Personality")
+        for key, label in (("personality", "Personality Trait"), ("ideal", "Ideal"), ("bond", "Bond"), ("flaw", "Flaw")):
+            if traits.get(key):
+                paragraph(f"{label}: {traits[key]}")
+    if data.get("notes"):
+        heading("Notes")
+        for block in str(data["notes"]).splitlines():
+            if block.strip():
+                paragraph(block)
+            else:
+                y -= 6
+
+    cv.save()
+    return buf.getvalue()
+
+
+@dataclass(frozen=True, slots=True)
+class SheetJob:
+    """
+    One sheet of a bulk export: zip entry name, cache key and its sheet dict. The dict is kept even
+    when a render is cached, since the file can be pruned by a concurrent edit before it is streamed.
+    """
+    arcname: str
+    key: str
+    data: dict
+
+
+class _ZipSink:
+    """Write-only file object for zipfile: no seek(), so entries use data descriptors and can stream."""
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+class SheetPdfCache:
+    def __init__(self, cache_dir: str, workers: int = 2):
+        self.cache_dir = Path(cache_dir)
+        self.workers = max(1, workers)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def _procs(self) -> ProcessPoolExecutor:
+        # Started on first bulk export so creating the app never forks worker processes
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+            return self._pool
+
+    @staticmethod
+    def key(char) -> str:
+        stamp = char.updated_at or char.created_at
+        return f"{char.id}-{stamp:%Y%m%d%H%M%S%f}-v{RENDER_VERSION}"
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def _store(self, key: str, pdf: bytes) -> Path:
+        path = self.path(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+        tmp.write_bytes(pdf)
+        os.replace(tmp, path)
+        # Older renders of the same character are stale now
+        char_id = key.split("-", 1)[0]
+        for old in self.cache_dir.glob(f"{char_id}-*.pdf"):
+            if old != path:
+                old.unlink(missing_ok=True)
+        return path
+
+    def discard(self, char_id: int) -> None:
+        for old in self.cache_dir.glob(f"{char_id}-*.pdf"):
+            old.unlink(missing_ok=True)
+
+    def get_or_render(self, char) -> tuple[Path, str]:
+        """Path of the character's rendered sheet and its cache key (use as ETag)."""
+        key = self.key(char)
+        path = self.path(key)
+        if not path.exists():
+            path = self._store(key, render_sheet_pdf(char.to_sheet_dict()))
+        return path, key
+
+    def prepare(self, chars, arcname) -> list[SheetJob]:
+        """Build export jobs inside the request (sheet dicts need the database)."""
+        return [SheetJob(arcname(char), self.key(char), char.to_sheet_dict()) for char in chars]
+
+    def stream_zip(self, jobs: list[SheetJob]) -> Iterator[bytes]:
+        """
+        Zip of every sheet: cached ones first, then the rest as the worker processes finish them.
+        A sheet that fails to render becomes a short .txt entry, so one bad sheet never truncates
+        the download.
+        """
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:  # PDFs are already compressed
+            pending = []
+            for job in jobs:
+                try:
+                    pdf = self.path(job.key).read_bytes()
+                except OSError:  # never rendered, or pruned since prepare()
+                    pending.append(job)
+                    continue
+                zf.writestr(job.arcname, pdf)
+                yield sink.drain()
+            if pending:
+                try:
+                    futures = {self._procs().submit(render_sheet_pdf, job.data): job for job in pending}
+                except Exception:  # pool could not start; render the rest here
+                    self.shutdown()
+                    futures = {}
+                    for job in pending:
+                        self._write(zf, job, lambda job=job: render_sheet_pdf(job.data))
+                        yield sink.drain()
+                for future in as_completed(futures):
+                    self._write(zf, futures[future], future.result)
+                    yield sink.drain()
+        yield sink.drain()
+
+    def _write(self, zf: zipfile.ZipFile, job: SheetJob, result) -> None:
+        """Add one freshly rendered sheet (result() -> bytes) to the zip and the cache, or an error entry."""
+        try:
+            pdf = result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self.shutdown()
+            zf.writestr(job.arcname.removesuffix(".pdf") + ".error.txt", f"Could not render this sheet: {e}\n")
+            return
+        zf.writestr(job.arcname, pdf)
+        try:
+            self._store(job.key, pdf)
+        except OSError:
+            pass  # the zip entry is complete; it is simply rendered again next time
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_cache: SheetPdfCache | None = None
+
+def init_app(app) -> SheetPdfCache:
+    """Set up the sheet PDF cache. Called once from create_app()."""
+    global _cache
+    cfg = app.config
+    _cache = SheetPdfCache(cfg.get("SHEET_PDF_CACHE_DIR", "data/sheet_pdfs"), workers=cfg.get("SHEET_PDF_WORKERS", 2))
+    app.extensions["sheet_pdfs"] = _cache
+    return _cache
+
+def get_sheet_pdfs() -> SheetPdfCache:
+    if _cache is None:
+        raise RuntimeError("Sheet PDF cache not initialised; call sheet_pdf_service.init_app(app)")
+    return _cache
@@ -1,10 +1,18 @@
 """
 SRD 5.1 data — immutable source of truth for CharacterForge.
 All character builds must validate against this data.
+
+The raw tables below are turned into frozen, slotted records and lookup
+indexes once at import; nothing here is rebuilt per request.
 """
 from __future__ import annotations
+import json
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
 
-SRD_RACES = [
+_RACE_DATA = [
     {"name": "Dragonborn", "speed": 30, "ability_bonuses": {"strength": 2, "charisma": 1}, "traits": ["Draconic Ancestry", "Breath Weapon", "Damage Resistance"]},
     {"name": "Dwarf (Hill)", "speed": 25, "ability_bonuses": {"constitution": 2, "wisdom": 1}, "traits": ["Darkvision", "Dwarven Resilience", "Stonecunning", "Dwarven Toughness"]},
     {"name": "Dwarf (Mountain)", "speed": 25, "ability_bonuses": {"constitution": 2, "strength": 2}, "traits": ["Darkvision", "Dwarven Resilience", "Stonecunning", "Dwarven Armor Training"]},
@@ -21,7 +29,7 @@ SRD_RACES = [
     {"name": "Tiefling", "speed": 30, "ability_bonuses": {"intelligence": 1, "charisma": 2}, "traits": ["Darkvision", "Hellish Resistance", "Infernal Legacy"]},
 ]
 
-SRD_CLASSES = [
+_CLASS_DATA = [
     {"name": "Barbarian", "hit_die": "d12", "primary_ability": "Strength", "saving_throws": ["Strength", "Constitution"],
      "armor_proficiencies": ["Light armor", "Medium armor", "Shields"],
      "weapon_proficiencies": ["Simple weapons", "Martial weapons"],
@@ -84,7 +92,7 @@ SRD_CLASSES = [
      "features_by_level": {1: ["Spellcasting", "Arcane Recovery"], 2: ["Arcane Tradition"]}},
 ]
 
-SRD_BACKGROUNDS = [
+_BACKGROUND_DATA = [
     {"name": "Acolyte", "skill_proficiencies": ["Insight", "Religion"], "equipment": ["Holy symbol", "Prayer book", "5 sticks of incense", "Vestments", "Common clothes", "15 gp pouch"], "feature": "Shelter of the Faithful"},
     {"name": "Criminal", "skill_proficiencies": ["Deception", "Stealth"], "equipment": ["Crowbar", "Dark common clothes with hood", "15 gp pouch"], "feature": "Criminal Contact"},
     {"name": "Folk Hero", "skill_proficiencies": ["Animal Handling", "Survival"], "equipment": ["Artisan's tools", "Shovel", "Iron pot", "Common clothes", "10 gp pouch"], "feature": "Rustic Hospitality"},
@@ -100,13 +108,13 @@ SRD_BACKGROUNDS = [
     {"name": "Urchin", "skill_proficiencies": ["Sleight of Hand", "Stealth"], "equipment": ["Small knife", "Map of home city", "Pet mouse", "Token from parents", "Common clothes", "10 gp pouch"], "feature": "City Secrets"},
 ]
 
-SRD_ALIGNMENTS = [
+SRD_ALIGNMENTS = (
     "Lawful Good", "Neutral Good", "Chaotic Good",
     "Lawful Neutral", "True Neutral", "Chaotic Neutral",
-    "Lawful Evil", "Neutral Evil", "Chaotic Evil"
-]
+    "Lawful Evil", "Neutral Evil", "Chaotic Evil",
+)
 
-ALL_SKILLS = [
+_SKILL_DATA = [
     {"name": "Acrobatics", "ability": "dexterity"},
     {"name": "Animal Handling", "ability": "wisdom"},
     {"name": "Arcana", "ability": "intelligence"},
@@ -127,23 +135,116 @@ ALL_SKILLS = [
     {"name": "Survival", "ability": "wisdom"},
 ]
 
-PROFICIENCY_BY_LEVEL = {
-    1: 2, 2: 2, 3: 2, 4: 2, 5: 3, 6: 3, 7: 3, 8: 3,
-    9: 4, 10: 4, 11: 4, 12: 4, 13: 5, 14: 5, 15: 5, 16: 5,
-    17: 6, 18: 6, 19: 6, 20: 6,
-}
+# Index = character level; 0 is a placeholder so PROFICIENCY_BY_LEVEL[level] reads naturally.
+PROFICIENCY_BY_LEVEL = (2,) + tuple(2 + (lvl - 1) // 4 for lvl in range(1, 21))
+MAX_LEVEL = 20
+
+# ─── RECORDS ────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class Race:
+    name: str
+    speed: int
+    ability_bonuses: Mapping[str, int]
+    traits: tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class CharClass:
+    name: str
+    hit_die: str
+    hit_die_value: int
+    primary_ability: str
+    saving_throws: tuple[str, ...]
+    armor_proficiencies: tuple[str, ...]
+    weapon_proficiencies: tuple[str, ...]
+    skill_choices: tuple[str, ...]
+    num_skills: int
+    features_by_level: Mapping[int, tuple[str, ...]]
+    # cumulative_features[level] = every feature gained at levels 1..level
+    cumulative_features: tuple[tuple[str, ...], ...]
+
+    def features_at(self, level: int) -> tuple[str, ...]:
+        return self.cumulative_features[max(0, min(level, MAX_LEVEL))]
+
+
+@dataclass(frozen=True, slots=True)
+class Background:
+    name: str
+    skill_proficiencies: tuple[str, ...]
+    equipment: tuple[str, ...]
+    feature: str
+
+
+@dataclass(frozen=True, slots=True)
+class Skill:
+    name: str
+    ability: str
+
+
+def _make_class(d: dict) -> CharClass:
+    by_level = {lvl: tuple(feats) for lvl, feats in d["features_by_level"].items()}
+    cumulative, acc = [()], ()
+    for lvl in range(1, MAX_LEVEL + 1):
+        acc = acc + by_level.get(lvl, ())
+        cumulative.append(acc)
+    return CharClass(
+        name=d["name"], hit_die=d["hit_die"], hit_die_value=int(d["hit_die"][1:]),
+        primary_ability=d["primary_ability"], saving_throws=tuple(d["saving_throws"]),
+        armor_proficiencies=tuple(d["armor_proficiencies"]),
+        weapon_proficiencies=tuple(d["weapon_proficiencies"]),
+        skill_choices=tuple(d["skill_choices"]), num_skills=d["num_skills"],
+        features_by_level=MappingProxyType(by_level), cumulative_features=tuple(cumulative),
+    )
+
+
+SRD_RACES: tuple[Race, ...] = tuple(
+    Race(d["name"], d["speed"], MappingProxyType(dict(d["ability_bonuses"])), tuple(d["traits"]))
+    for d in _RACE_DATA
+)
+SRD_CLASSES: tuple[CharClass, ...] = tuple(_make_class(d) for d in _CLASS_DATA)
+SRD_BACKGROUNDS: tuple[Background, ...] = tuple(
+    Background(d["name"], tuple(d["skill_proficiencies"]), tuple(d["equipment"]), d["feature"])
+    for d in _BACKGROUND_DATA
+)
+ALL_SKILLS: tuple[Skill, ...] = tuple(Skill(d["name"], d["ability"]) for d in _SKILL_DATA)
+
+# ─── INDEXES ────────────────────────────────────────────────────────────────
+
+def _alias_key(name: str) -> str:
+    """'Elf (High)', 'elf high', 'High-Elf' -> comparable keys."""
+    return re.sub(r"[^a-z0-9]", "", name.casefold())
+
+def _index(records) -> tuple[Mapping, Mapping]:
+    exact, aliases = {}, {}
+    for rec in records:
+        exact[rec.name] = rec
+        aliases[_alias_key(rec.name)] = rec
+        # "Elf (High)" is also reachable as "High Elf"
+        m = re.fullmatch(r"(.+?) \((.+)\)", rec.name)
+        if m:
+            aliases.setdefault(_alias_key(m.group(2) + m.group(1)), rec)
+    return MappingProxyType(exact), MappingProxyType(aliases)
+
+RACES_BY_NAME, _RACE_ALIASES = _index(SRD_RACES)
+CLASSES_BY_NAME, _CLASS_ALIASES = _index(SRD_CLASSES)
+BACKGROUNDS_BY_NAME, _BACKGROUND_ALIASES = _index(SRD_BACKGROUNDS)
+SKILL_ABILITY: Mapping[str, str] = MappingProxyType({s.name: s.ability for s in ALL_SKILLS})
+
+# Pre-serialised for the wizard's client-side racial bonus preview
+RACIAL_BONUSES_JSON = json.dumps({r.name: dict(r.ability_bonuses) for r in SRD_RACES})
 
-def get_race(name: str) -> dict | None:
-    return next((r for r in SRD_RACES if r["name"] == name), None)
+def get_race(name: str) -> Race | None:
+    return RACES_BY_NAME.get(name) or _RACE_ALIASES.get(_alias_key(name or ""))
 
-def get_class(name: str) -> dict | None:
-    return next((c for c in SRD_CLASSES if c["name"] == name), None)
+def get_class(name: str) -> CharClass | None:
+    return CLASSES_BY_NAME.get(name) or _CLASS_ALIASES.get(_alias_key(name or ""))
 
-def get_background(name: str) -> dict | None:
-    return next((b for b in SRD_BACKGROUNDS if b["name"] == name), None)
+def get_background(name: str) -> Background | None:
+    return BACKGROUNDS_BY_NAME.get(name) or _BACKGROUND_ALIASES.get(_alias_key(name or ""))
 
 def proficiency_bonus(level: int) -> int:
-    return PROFICIENCY_BY_LEVEL.get(level, 2)
+    return PROFICIENCY_BY_LEVEL[level] if 1 <= level <= MAX_LEVEL else 2
 
 def ability_modifier(score: int) -> int:
     return (score - 10) // 2
@@ -70,6 +70,43 @@ function appendMsg(text, role) {
   aiChat.scrollTop = aiChat.scrollHeight;
 }
 
+// Stream an /characters/ai_step reply as Server-Sent Events.
+// Calls onToken(token, textSoFar) for every chunk and resolves with the full reply.
+// Pass an AbortController signal to cancel; the server then drops the upstream request.
+async function streamAiStep(payload, onToken, signal) {
+  const res = await fetch('/characters/ai_step', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json', 'Accept': 'text/event-stream'},
+    body: JSON.stringify(Object.assign({}, payload, {stream: true})),
+    signal: signal
+  });
+  if (!res.ok || !res.body) throw new Error('HTTP ' + res.status);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  while (true) {
+    const {value, done} = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, {stream: true});
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) >= 0) {
+      const event = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      if (event.startsWith('event: done')) return text;
+      const dataLine = event.split('\n').find(l => l.startsWith('data: '));
+      if (!dataLine) continue;
+      const token = JSON.parse(dataLine.slice(6)).token || '';
+      text += token;
+      if (onToken) onToken(token, text);
+    }
+  }
+  return text;
+}
+
+let aiAbort = null;
+
 async function sendAiMessage() {
   if (!aiInput || !aiChat) return;
   const msg = aiInput.value.trim();
@@ -85,20 +122,22 @@ async function sendAiMessage() {
     new FormData(form).forEach((v, k) => charData[k] = v);
   }
 
+  if (aiAbort) aiAbort.abort();
+  aiAbort = new AbortController();
+  appendMsg('', 'dm');
+  const replyEl = aiChat.lastElementChild;
   try {
-    const res = await fetch('/characters/ai_suggest', {
-      method: 'POST',
-      headers: {'Content-Type': 'application/json'},
-      body: JSON.stringify({
-        step: document.getElementById('current-step')?.value || 'general',
-        character: charData,
-        message: msg
-      })
-    });
-    const data = await res.json();
-    appendMsg(data.reply || '(no response)', 'dm');
+    const reply = await streamAiStep({
+      step: document.getElementById('current-step')?.value || 'general',
+      build: charData,
+      message: msg
+    }, (token, text) => {
+      replyEl.textContent = text;
+      aiChat.scrollTop = aiChat.scrollHeight;
+    }, aiAbort.signal);
+    if (!reply) replyEl.textContent = '(no response)';
   } catch (e) {
-    appendMsg('[AI unavailable]', 'dm');
+    if (e.name !== 'AbortError') replyEl.textContent = '[AI unavailable]';
   }
   aiSend.disabled = false;
 }